@@ -14,7 +14,22 @@ from maya.app.general.mayaMixin import MayaQWidgetBaseMixin
 from maya import cmds as cmds
 from maya import mel as mel 
 
+from callback_recorder import CallbackRecorder, MayaEventSource
+from capture_filter import CAPTURE_FILTER_FILE_NAME, load_capture_filter
+from field_driver import FIELD_CURVE, FIELD_KINDS, FIELD_NOISE, FIELD_RAMP, make_field
+from history_capture import CaptureSession, RecentCommandBuffer
+from iteration_expression import IterationExpression, IterationExpressionError
+from mel_parser import FLAG, NUMBER, STRING, parse_mel_line, replace_mel_token
+from mel_transpiler import NUMERIC_SET_ATTR_TYPES, bind_statement_arguments
+from recording_ir import RECORDING_FILE_SUFFIX, ParameterSpec, RecordedCommand, Recording, split_variable_type
+from script_generator import ScriptGenerator
+
 UI_FILE_PATH = "/Users/shiinaayame/Documents/maya tool/AutoScriptingRecorder/AutoScriptingRecorder/form.ui"
+HISTORY_POLL_INTERVAL_MS = 200
+RECENT_COMMAND_POLL_INTERVAL_MS = 1000
+RECORDING_BACKEND_HISTORY = 0
+RECORDING_BACKEND_CALLBACKS = 1
+RECENT_HISTORY_ROTATE_SIZE = 8 * 1024 * 1024 #直近コマンド用の履歴ファイルがこの大きさを超えたら新しいファイルに切り替える
 
 class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
     def __init__(self, parent=None):
@@ -27,13 +42,49 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         self.tempdir = ""
         self.script_name = ""
         self.is_overwrite_confirm = False
+        self.capture_session = None
+        self.callback_recorder = None #コールバックで記録する場合の記録処理
+        self.is_record_paused = False
+        self.command_echo_state = None #記録前のEcho All Commandsの状態
+
+        self.capture_timer = QTimer(self)
+        self.capture_timer.setInterval(HISTORY_POLL_INTERVAL_MS)
+        self.capture_timer.timeout.connect(self.process_mel_commands_on_concole)
+
+        self.recent_command_buffer = None
+        self.recent_history_dir = None
+        self.recent_history_index = 0
+        self.recent_command_timer = QTimer(self)
+        self.recent_command_timer.setInterval(RECENT_COMMAND_POLL_INTERVAL_MS)
+        self.recent_command_timer.timeout.connect(self.poll_recent_commands)
 
         self.ui.start_record_button.clicked.connect(self.start_record_console)
         self.ui.end_record_button.clicked.connect(self.end_record_console)
+        self.ui.pause_record_button.clicked.connect(self.toggle_pause_record)
+        self.ui.recording_backend_dropdown.clear()
+        self.ui.recording_backend_dropdown.addItems(["Script Editor History", "Scene Callbacks"])
+        self.ui.recording_backend_dropdown.setCurrentIndex(RECORDING_BACKEND_HISTORY) #既定は履歴からの記録
+        self.ui.keep_recent_commands_checkbox.toggled.connect(self.toggle_recent_commands)
+        self.ui.recent_command_count_spinbox.valueChanged.connect(self.recent_command_count_changed)
+        self.ui.capture_recent_commands_button.clicked.connect(self.capture_recent_commands)
         self.ui.mel_command_capture_list.itemSelectionChanged.connect(self.show_mel_edit_widget)
         self.ui.generate_script_button.clicked.connect(self.generate_python_script)
         self.ui.set_hotkey_keysequence.setClearButtonEnabled(True)
         self.ui.generate_ui_checkbox.setChecked(False)
+        self.ui.batch_commands_checkbox.setChecked(True)
+        self.ui.undo_mode_dropdown.clear()
+        self.ui.undo_mode_dropdown.addItems(["Single Undo Chunk", "Flush Undo Every N Objects", "Disable Undo"])
+        self.ui.suspend_refresh_checkbox.setChecked(True)
+        self.ui.field_driver_dropdown.clear()
+        self.ui.field_driver_dropdown.addItems(["Ramp Over Selection", "Noise From Position", "Remap Curve"])
+        self.ui.field_driver_dropdown.currentIndexChanged.connect(self.field_driver_changed)
+        self.ui.set_field_button.clicked.connect(self.set_field_variable)
+        self.ui.iteration_order_dropdown.clear()
+        self.ui.iteration_order_dropdown.addItems(["Selection Order", "Along X", "Along Y", "Along Z", "Distance From Point", "Nearest Neighbour Path", "Grid (Z Rows, X Columns)"])
+        self.ui.optimize_commands_checkbox.setChecked(True)
+        self.ui.modifier_set_attr_checkbox.setChecked(False)
+        self.ui.benchmark_checkbox.setChecked(False)
+        self.ui.api_transforms_checkbox.setChecked(False)
         self.ui.save_script_button.clicked.connect(self.save_python_script)
         self.ui.run_script_button.clicked.connect(self.run_script) 
         self.ui.name_script_input_box.textChanged.connect(self.set_script_name)
@@ -44,6 +95,8 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         self.ui.save_warning_label.setStyleSheet("color: red")
         self.ui.generation_warning_label.setText("")
         self.ui.generation_warning_label.setStyleSheet("color: red")
+        self.ui.optimization_result_label.setText("")
+        self.ui.optimization_result_label.setStyleSheet("color: green")
         self.ui.run_error_label.setText("")
         self.ui.run_error_label.setStyleSheet("color: red")
 
@@ -57,6 +110,7 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         self.variable_name_dict = {}
         self.variable_iteration_dict = {}
         self.random_variable_dict = {}
+        self.field_variable_dict = {}
         self.variable_of_line_record_dict = {}
 
         if not cmds.objExists("autoscripting_node"):
@@ -85,47 +139,181 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             with open(data_storage_path, mode="w", encoding="utf-8") as data_storage:
                 json.dump(self.data_storage_dict, data_storage, indent=1)
         
+    def capture_filter(self):
+        #ユーザー設定フォルダ、プロジェクトフォルダの順に記録フィルタの設定を読み込む
+        config_paths = [
+            os.path.join(cmds.internalVar(userAppDir=True), CAPTURE_FILTER_FILE_NAME),
+            os.path.join(cmds.workspace(q=True, rootDirectory=True), CAPTURE_FILTER_FILE_NAME),
+        ]
+        try:
+            return load_capture_filter(config_paths)
+        except (ValueError, re.error) as e:
+            print(e)
+            return None
+
+    def recent_history_path(self):
+        return os.path.join(self.recent_history_dir, f"hfn_recent_{self.recent_history_index}.txt")
+
+    def toggle_recent_commands(self, checked):
+        if checked and self.recent_command_buffer is None:
+            self.recent_history_dir = tempfile.mkdtemp()
+            self.recent_history_index = 0
+            recent_history_path = self.recent_history_path()
+            with open(recent_history_path, "w", encoding="utf-8") as f:
+                pass
+            self.recent_command_buffer = RecentCommandBuffer(recent_history_path, self.capture_filter(), self.ui.recent_command_count_spinbox.value())
+            cmds.scriptEditorInfo(hfn=recent_history_path, wh=True) #記録中でなくても履歴をファイルに書き出す
+            self.recent_command_timer.start()
+        elif not checked and self.recent_command_buffer is not None:
+            self.recent_command_timer.stop()
+            try:
+                cmds.scriptEditorInfo(hfn=self.recent_history_path(), wh=False)
+            except Exception as e:
+                print(e)
+            self.recent_command_buffer = None
+            if os.path.exists(self.recent_history_dir):
+                shutil.rmtree(self.recent_history_dir)
+
+    def recent_command_count_changed(self):
+        if self.recent_command_buffer is not None:
+            self.recent_command_buffer.set_max_commands(self.ui.recent_command_count_spinbox.value())
+
+    def poll_recent_commands(self):
+        if self.recent_command_buffer is None:
+            return
+        self.recent_command_buffer.poll()
+        old_history_path = self.recent_history_path()
+        if self.capture_session is None and os.path.getsize(old_history_path) > RECENT_HISTORY_ROTATE_SIZE:
+            #記録中でなければ新しい履歴ファイルに切り替えて古いファイルを削除
+            self.recent_history_index += 1
+            recent_history_path = self.recent_history_path()
+            with open(recent_history_path, "w", encoding="utf-8") as f:
+                pass
+            cmds.scriptEditorInfo(hfn=recent_history_path, wh=True)
+            self.recent_command_buffer.poll() #切り替え前に書き込まれた残りの行
+            self.recent_command_buffer.switch_file(recent_history_path)
+            os.remove(old_history_path)
+
+    def capture_recent_commands(self):
+        if self.recent_command_buffer is None or self.capture_session is not None:
+            return
+        self.recent_command_buffer.poll()
+        mel_records = self.recent_command_buffer.recent_records(self.ui.recent_command_count_spinbox.value())
+        self.ui.mel_command_capture_list.clear()
+        self.ui.mel_command_capture_list.addItems(mel_records)
+        self.reset_recording_state()
+
+    def reset_recording_state(self):
+        self.ui.generated_python_script_view.setPlainText("")
+        self.variable_name_dict.clear()
+        self.variable_original_value_dict.clear()
+        self.variable_iteration_dict.clear()
+        self.random_variable_dict.clear()
+        self.field_variable_dict.clear()
+        self.variable_of_line_record_dict.clear()
+        selected_objects = cmds.ls(sl=True)
+        self.operating_mesh = selected_objects[0] if selected_objects else None #選択がない場合はメッシュ名を置換しない
+
     def start_record_console(self):
-        self.tempdir = tempfile.mkdtemp() #テンポラリディレクトリ作成
-        self.path = os.path.join(self.tempdir, "hfn_temp.txt") #テンポラリファイルパス作成
-        with open(self.path, "w", encoding="utf-8") as f: #テンポラリファイル作成
-            pass
+        if self.ui.recording_backend_dropdown.currentIndex() == RECORDING_BACKEND_CALLBACKS:
+            #履歴の文字列ではなく、アトリビュートの変更とノードの追加を直接記録する
+            self.ui.mel_command_capture_list.clear()
+            selected_objects = cmds.ls(sl=True, long=True)
+            self.callback_recorder = CallbackRecorder(MayaEventSource(selected_objects), cmds.ls(sl=True)[0] if selected_objects else None)
+            self.callback_recorder.start()
+            self.ui.recording_backend_dropdown.setEnabled(False)
+            self.ui.recordng_label.setText("Recording Action ...")
+            return
+        if self.recent_command_buffer is not None: #直近コマンド用の履歴ファイルを共有する
+            self.tempdir = None
+            self.path = self.recent_history_path()
+        else:
+            self.tempdir = tempfile.mkdtemp() #テンポラリディレクトリ作成
+            self.path = os.path.join(self.tempdir, "hfn_temp.txt") #テンポラリファイルパス作成
+            with open(self.path, "w", encoding="utf-8") as f: #テンポラリファイル作成
+                pass
+        self.ui.keep_recent_commands_checkbox.setEnabled(False)
+        self.ui.mel_command_capture_list.clear() #リストクリア
+        echo_all_commands = self.ui.echo_all_commands_checkbox.isChecked()
+        self.capture_session = CaptureSession(self.path, self.capture_filter(), echo_all_commands) #履歴ファイルの追従読み込み開始
+        self.capture_session.tailer.skip_to_end()
+        if echo_all_commands:
+            self.command_echo_state = cmds.commandEcho(q=True, state=True)
+            cmds.commandEcho(state=True) #ラッパー経由でしか履歴に出ないコマンドも記録する
         self.ui.recordng_label.setText("Recording Action ...")
         cmds.scriptEditorInfo(hfn=self.path, wh=True) #Mayaのスクリプトエディタの履歴をファイルに書き出し開始
+        self.capture_timer.start()
 
-    def process_mel_commands_on_concole(self):
-        self.ui.mel_command_capture_list.clear() #リストクリア
-        mel_records = [] #メルコマンド格納用リスト
-        if not os.path.exists(self.path):
+    def toggle_pause_record(self):
+        if self.callback_recorder is not None:
+            if not self.is_record_paused:
+                self.callback_recorder.pause()
+            else:
+                self.callback_recorder.resume()
+            self.is_record_paused = not self.is_record_paused
+            self.ui.pause_record_button.setText("Resume Record" if self.is_record_paused else "Pause Record")
+            self.ui.recordng_label.setText("Recording Paused" if self.is_record_paused else "Recording Action ...")
+            return
+        if self.capture_session is None:
+            return
+        if not self.is_record_paused:
+            self.capture_timer.stop()
+            self.process_mel_commands_on_concole(True) #一時停止までの履歴を処理
+            if self.tempdir is not None:
+                cmds.scriptEditorInfo(hfn=self.path, wh=False)
+            self.is_record_paused = True
+            self.ui.pause_record_button.setText("Resume Record")
+            self.ui.recordng_label.setText("Recording Paused")
+        else:
+            if self.tempdir is not None:
+                cmds.scriptEditorInfo(hfn=self.path, wh=True)
+            self.capture_session.resume() #テンポラリディレクトリと読み込み位置はそのまま使う
+            self.is_record_paused = False
+            self.ui.pause_record_button.setText("Pause Record")
+            self.ui.recordng_label.setText("Recording Action ...")
+            self.capture_timer.start()
+
+    def process_mel_commands_on_concole(self, is_final=False):
+        if self.capture_session is None:
             print("File does not exist")
             return
-        with open(self.path, "r", encoding="utf-8") as read_mel_record: #メルコマンド読み込み
-            mel_record_raw = read_mel_record.readlines()
-        for mel_record in mel_record_raw: #メルコマンド処理
-            if mel_record.startswith("import"):
-                break #import文以降は無視(実行されたこのツールのスクリプトも記録されているため)
-            elif mel_record.startswith("select"):
-                continue #selectコマンドは無視(Mayaではselectの誤操作は多い・また、選択はend_recordingの直前の選択に準拠するため)
-            else:
-                mel_records.append(mel_record.strip("\n")) 
-        self.ui.mel_command_capture_list.addItems(mel_records) #リストにメルコマンド追加
+        removed_count, mel_records = self.capture_session.poll(is_final) #前回読み込んだ位置以降の新しい行のみ処理
+        mel_records_obj = self.ui.mel_command_capture_list
+        for _ in range(removed_count):
+            mel_records_obj.takeItem(mel_records_obj.count() - 1) #アンドゥで取り消されたコマンドをリストから削除
+        if mel_records:
+            mel_records_obj.addItems(mel_records) #リストにメルコマンド追加
 
     def end_record_console(self):
-        try:
-            cmds.scriptEditorInfo(hfn=self.path, wh=False) #Mayaのスクリプトエディタの履歴をファイルに書き出し停止
-        except Exception as e:
-            print(e)
-        self.process_mel_commands_on_concole() #メルコマンド処理
-        if os.path.exists(self.tempdir):
+        if self.callback_recorder is not None:
+            recording = self.callback_recorder.stop() #記録終了時の値で記録を作る
+            self.callback_recorder = None
+            self.is_record_paused = False
+            self.ui.pause_record_button.setText("Pause Record")
+            self.ui.recording_backend_dropdown.setEnabled(True)
+            self.ui.recordng_label.setText("")
+            self.ui.generated_python_script_view.setPlainText("")
+            self.load_recording(recording)
+            return
+        if self.tempdir is not None:
+            try:
+                cmds.scriptEditorInfo(hfn=self.path, wh=False) #Mayaのスクリプトエディタの履歴をファイルに書き出し停止
+            except Exception as e:
+                print(e)
+        if self.command_echo_state is not None:
+            cmds.commandEcho(state=self.command_echo_state) #記録前の状態に戻す
+            self.command_echo_state = None
+        self.capture_timer.stop()
+        if not self.is_record_paused:
+            self.process_mel_commands_on_concole(True) #残りのメルコマンド処理
+        self.capture_session = None
+        self.is_record_paused = False
+        self.ui.pause_record_button.setText("Pause Record")
+        if self.tempdir is not None and os.path.exists(self.tempdir):
             shutil.rmtree(self.tempdir) #テンポラリディレクトリ削除
+        self.ui.keep_recent_commands_checkbox.setEnabled(True)
         self.ui.recordng_label.setText("")
-        self.ui.generated_python_script_view.setPlainText("")
-        self.variable_name_dict.clear()
-        self.variable_original_value_dict.clear()
-        self.variable_iteration_dict.clear()
-        self.random_variable_dict.clear()
-        self.variable_of_line_record_dict.clear()
-        self.operating_mesh = cmds.ls(sl=True)[0]
+        self.reset_recording_state()
 
     def set_script_name(self):
         self.script_name = self.ui.name_script_input_box.text()
@@ -142,9 +330,31 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             self.ui.edit_script_button.hide()
 
     def search_for_potential_variables(self, line):
-        variables_ls = re.findall(r"-\w+ [\d|.|\s]+", line)
+        #-t 1 2 3 のように複数の数値を取るフラグやsetAttrの型付きの値を、(表示名, トークン番号のリスト)のベクトル変数の候補にする
+        mel_line = parse_mel_line(line)
+        token_indices = {id(token): index for index, token in enumerate(mel_line.tokens)}
+        variables_ls = []
+        for statement in mel_line.statements:
+            for flag, flag_args in statement.flags:
+                if len(flag_args) > 1 and all(arg.kind == NUMBER for arg in flag_args):
+                    variables_ls.append((" ".join([flag] + [arg.text for arg in flag_args]), [token_indices[id(arg)] for arg in flag_args]))
+            bound_arguments = bind_statement_arguments(statement) if statement.command == "setAttr" else None
+            if bound_arguments is not None: #setAttr -type double3 のように型を指定した複数の値もベクトルの候補にする
+                positional_tokens, flag_tokens = bound_arguments
+                value_types = [flag_args[0].value for flag in ("type", "typ") for flag_args in flag_tokens.get(flag, [])]
+                value_tokens = positional_tokens[1:]
+                if len(value_types) == 1 and value_types[0] in NUMERIC_SET_ATTR_TYPES and len(value_tokens) > 1 and all(token.kind == NUMBER for token in value_tokens):
+                    variables_ls.append((" ".join([value_types[0]] + [token.text for token in value_tokens]), [token_indices[id(token)] for token in value_tokens]))
         return variables_ls
 
+    def populate_variable_dropdown(self, line):
+        #一つのトークンの後ろにベクトルの候補を並べ、候補ごとのトークン番号を項目のデータとして持たせる
+        self.ui.set_to_variable_dropbox.clear()
+        for token_index, word in enumerate(parse_mel_line(line).words):
+            self.ui.set_to_variable_dropbox.addItem(word, [token_index])
+        for label, token_indices in self.search_for_potential_variables(line):
+            self.ui.set_to_variable_dropbox.addItem(label, token_indices)
+
     def show_mel_edit_widget(self):
         selected_line = self.ui.mel_command_capture_list.selectedItems()
         selected_line_index = self.ui.mel_command_capture_list.currentRow()
@@ -155,6 +365,7 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             self.ui.hifen_staticlabel.hide()
             self.ui.random_to_inputbox.hide()
             self.ui.randomize_variable_button.hide()
+            self.hide_field_widgets()
             self.ui.delete_variable_button.hide()
             self.ui.add_iteration_checkbox.hide()
             self.ui.randomize_warning.setText("")
@@ -162,8 +373,7 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             selected_line_text = str(selected_line[0].text())
             self.ui.edit_mel_input_box.setText(selected_line_text)
             self.ui.update_mel_button.clicked.connect(self.update_mel)
-            self.ui.set_to_variable_dropbox.clear()
-            self.ui.set_to_variable_dropbox.addItems([str(component) for component in selected_line_text.rstrip(";").split(" ")])
+            self.populate_variable_dropdown(selected_line_text)
             self.ui.add_to_variable_button.clicked.connect(self.add_to_variable)
             self.ui.variables_list_list.clear()
             if selected_line_index in self.variable_of_line_record_dict:
@@ -180,14 +390,13 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         selected_line = self.ui.mel_command_capture_list.selectedItems() #選択行取得
         selected_line[0].setText(self.ui.edit_mel_input_box.text()) #選択行更新
         selected_line_text = str(selected_line[0].text()) #選択行テキスト取得
-        self.ui.set_to_variable_dropbox.clear() 
-        self.ui.set_to_variable_dropbox.addItems([str(component) for component in selected_line_text.rstrip(";").split(" ")])  #ドロップダウンリスト更新
+        self.populate_variable_dropdown(selected_line_text) #ドロップダウンリスト更新
 
     def add_to_variable(self):
         selected_line = self.ui.mel_command_capture_list.selectedItems() #選択したMELコマンドラインのアイテム取得
         selected_line_index = self.ui.mel_command_capture_list.currentRow() #選択したMELコマンドラインのインデックス取得
         selected_line_text = str(selected_line[0].text()) #選択したMELコマンドラインのテキスト取得
-        selected_line_component_list = [str(component) for component in selected_line_text.rstrip(";").split(" ")] #選択行コンポーネントリスト作成
+        selected_line_tokens = parse_mel_line(selected_line_text).tokens #選択行のトークンリスト取得(キャッシュ済みの解析結果)
         variable_name = self.ui.variable_name_input_box.text() #ユーザの自作変数名取得
         self.ui.variable_name_input_box.setText("")
         if variable_name in self.variable_name_dict:
@@ -195,28 +404,43 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             return
         
         self.variable_original_value_dict[variable_name] = selected_line_text #deleteできるように変数の元の値を保存
-        selected_variable = self.ui.set_to_variable_dropbox.currentText() #ユーザが選択した変数化するMELコマンドの部分を取得
-        selected_variable_index = self.ui.set_to_variable_dropbox.currentIndex() #ユーザが選択した変数化するMELコマンドの部分のインデックスを取得
+        token_indices = self.ui.set_to_variable_dropbox.currentData() #ユーザが選択した変数化するMELコマンドの部分のトークン番号を取得
         if variable_name == "":
             self.ui.addvar_warning_label.setText("Name your variable")
             return
+        if not token_indices:
+            return
         
         if selected_line_index not in self.variable_of_line_record_dict:
             self.variable_of_line_record_dict[selected_line_index] = []
         self.variable_of_line_record_dict[selected_line_index].append(variable_name) #MELコマンドラインとそこに設定された変数名を記録
         
-        if re.fullmatch(r"-?\d+", selected_variable): #整数判定
-            var_type = "int"
-            selected_line_component_list[selected_variable_index] = "{" + str(variable_name) + "}"
-        elif re.fullmatch(r"-?\d+\.\d+", selected_variable): #浮動小数点数判定
-            var_type = "float"
-            selected_line_component_list[selected_variable_index] = "{" + str(variable_name) + "}"
+        if len(token_indices) > 1: #ベクトル変数(フラグの全ての値をまとめて一つの変数にする)
+            is_int = all(isinstance(selected_line_tokens[token_index].value, int) for token_index in token_indices)
+            var_type = ("int" if is_int else "float") + str(len(token_indices))
+            new_selected_line = selected_line_text
+            for component, token_index in reversed(list(enumerate(token_indices))): #後ろから置換して前のトークンの位置をずらさない
+                new_selected_line = replace_mel_token(new_selected_line, token_index, "{" + f"{variable_name}[{component}]" + "}")
         else:
-            var_type = "string" #文字列判定
-            selected_line_component_list[selected_variable_index] = "-{" + str(variable_name) + "}"
-
-        new_selected_line = " ".join(selected_line_component_list) + ";" #選択行コンポーネントリストを結合して新しい選択行テキスト作成
+            selected_variable_index = token_indices[0]
+            selected_token = selected_line_tokens[selected_variable_index]
+            if selected_token.kind == NUMBER and isinstance(selected_token.value, int): #整数判定
+                var_type = "int"
+                replacement = "{" + str(variable_name) + "}"
+            elif selected_token.kind == NUMBER: #浮動小数点数判定
+                var_type = "float"
+                replacement = "{" + str(variable_name) + "}"
+            else:
+                var_type = "string" #文字列判定
+                if selected_token.kind == FLAG:
+                    replacement = "-{" + str(variable_name) + "}"
+                elif selected_token.kind == STRING:
+                    replacement = "\"{" + str(variable_name) + "}\""
+                else:
+                    replacement = "{" + str(variable_name) + "}"
+            new_selected_line = replace_mel_token(selected_line_text, selected_variable_index, replacement) #選択したトークンのみを置換して新しい選択行テキスト作成
         selected_line[0].setText(new_selected_line) #MELディスプレイ更新
+        self.populate_variable_dropdown(new_selected_line) #変数化した後の行から候補とトークン番号を作り直す
         self.variable_name_dict[variable_name] = var_type #変数名と型を辞書に保存
 
         try:
@@ -233,9 +457,8 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         if self.ui.variables_list_list.selectedItems():
             self.ui.delete_variable_button.show()
             self.ui.delete_variable_button.clicked.connect(self.delete_variable)
-            selected_variable = self.ui.set_to_variable_dropbox.currentText()
-            try:
-                selected_variable = float(selected_variable)
+            selected_variable = self.ui.variables_list_list.selectedItems()[0].text()
+            if split_variable_type(self.variable_name_dict.get(selected_variable, "string"))[0] != "string": #数値(ベクトルを含む)の変数だけランダム・イテレーションを設定できる
                 self.ui.add_iteration_checkbox.show()
                 self.ui.add_iteration_checkbox.setChecked(False)
                 self.ui.add_iteration_checkbox.stateChanged.connect(self.iteration_checkbox_changed)
@@ -252,8 +475,10 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
                 except:
                     pass
                 self.ui.randomize_variable_button.clicked.connect(self.randomize_variable)
-            except ValueError:
-                pass
+                self.ui.field_driver_dropdown.show()
+                self.ui.field_parameter_inputbox.show()
+                self.ui.set_field_button.show()
+                self.field_driver_changed()
         else:
             self.ui.delete_variable_button.hide()
             self.ui.add_iteration_checkbox.hide()
@@ -263,6 +488,23 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             self.ui.hifen_staticlabel.hide()
             self.ui.random_to_inputbox.hide()
             self.ui.randomize_variable_button.hide()
+            self.hide_field_widgets()
+
+    def hide_field_widgets(self):
+        self.ui.field_driver_dropdown.hide()
+        self.ui.field_parameter_inputbox.hide()
+        self.ui.set_field_button.hide()
+
+    def field_driver_changed(self):
+        #ノイズは周波数、カーブは(位置 値)の組を入力する
+        field_kind = FIELD_KINDS[max(self.ui.field_driver_dropdown.currentIndex(), 0)]
+        if field_kind == FIELD_NOISE:
+            self.ui.field_parameter_inputbox.setPlaceholderText("frequency (0.1)")
+        elif field_kind == FIELD_CURVE:
+            self.ui.field_parameter_inputbox.setPlaceholderText("0 0, 0.5 1, 1 0")
+        else:
+            self.ui.field_parameter_inputbox.setPlaceholderText("")
+        self.ui.field_parameter_inputbox.setEnabled(field_kind != FIELD_RAMP)
 
     def delete_variable(self):
         selected_line = self.ui.mel_command_capture_list.selectedItems()[0]
@@ -278,6 +520,7 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             del self.variable_iteration_dict[item_to_be_deleted_name] 
         if item_to_be_deleted_name in self.random_variable_dict:
             del self.random_variable_dict[item_to_be_deleted_name]
+        self.field_variable_dict.pop(item_to_be_deleted_name, None)
         self.variable_of_line_record_dict[selected_line_index].remove(item_to_be_deleted_name)
         if self.variable_name_dict == {}:
             self.ui.generate_ui_checkbox.setChecked(False)
@@ -306,6 +549,34 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         self.ui.randomize_warning.setStyleSheet("color: #98FBCB")
         QTimer.singleShot(3000, lambda: self.reset_warning_label(self.ui.randomize_warning))
         self.random_variable_dict[item_to_be_randomized_name] = f"{random_from}, {random_to}"
+        self.field_variable_dict.pop(item_to_be_randomized_name, None) #ランダムとフィールドはどちらか一方
+
+    def set_field_variable(self):
+        self.ui.iteration_widget.hide()
+        self.ui.add_iteration_checkbox.hide()
+        selected_variable_name = self.ui.variables_list_list.selectedItems()[0].text()
+        field_kind = FIELD_KINDS[self.ui.field_driver_dropdown.currentIndex()]
+        try:
+            value_from = float(self.ui.random_from_inputbox.text())
+            value_to = float(self.ui.random_to_inputbox.text())
+        except ValueError:
+            self.ui.randomize_warning.setText("Input a valid numeric range")
+            self.ui.randomize_warning.setStyleSheet("color: red")
+            QTimer.singleShot(3000, lambda: self.reset_warning_label(self.ui.randomize_warning))
+            return
+        try:
+            field = make_field(field_kind, value_from, value_to, self.ui.field_parameter_inputbox.text())
+        except ValueError as error:
+            self.ui.randomize_warning.setText(str(error) if field_kind == FIELD_CURVE else "Input a valid frequency")
+            self.ui.randomize_warning.setStyleSheet("color: red")
+            QTimer.singleShot(3000, lambda: self.reset_warning_label(self.ui.randomize_warning))
+            return
+        self.ui.randomize_warning.setText("Field set")
+        self.ui.randomize_warning.setStyleSheet("color: #98FBCB")
+        QTimer.singleShot(3000, lambda: self.reset_warning_label(self.ui.randomize_warning))
+        self.field_variable_dict[selected_variable_name] = field
+        self.random_variable_dict.pop(selected_variable_name, None)
+        self.variable_iteration_dict.pop(selected_variable_name, None) #イテレーションがあるとそちらが優先されるため
 
     def iteration_checkbox_changed(self):
         if self.ui.add_iteration_checkbox.isChecked():
@@ -333,8 +604,14 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         except ValueError:
             self.ui.iteration_warning_label.setText("Only numeric value allowed")
             return
-        iteration_expression = f"{init_value} + (i {calculation_operator} {iteration_const})" #イテレーション式作成
+        iteration_expression = f"{init_value} + (i {calculation_operator} ({iteration_const}))" #イテレーション式作成
+        try:
+            IterationExpression(iteration_expression) #使えない名前や構文はここで報告
+        except IterationExpressionError as error:
+            self.ui.iteration_warning_label.setText(str(error))
+            return
         self.variable_iteration_dict[selected_variable_name] = iteration_expression #辞書に保存
+        self.field_variable_dict.pop(selected_variable_name, None)
         self.ui.iteration_warning_label.setText("Add iteration successful")
         self.ui.iteration_warning_label.setStyleSheet("color: #98FBCB")
         QTimer.singleShot(3000, lambda: self.reset_warning_label(self.ui.iteration_warning_label))
@@ -344,137 +621,111 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         if selected_variable_name in self.variable_iteration_dict:
             del self.variable_iteration_dict[selected_variable_name]
 
-    def generate_python_fucntion(self):
-        python_script_ls = []
-        generated_nodes = []
-        generated_node_index = 0
+    def generation_options(self):
+        return {
+            "batch_commands": self.ui.batch_commands_checkbox.isChecked(),
+            "batch_size": self.ui.batch_size_spinbox.value(),
+            "undo_mode": self.ui.undo_mode_dropdown.currentIndex(),
+            "flush_undo_every": self.ui.undo_flush_interval_spinbox.value(),
+            "suspend_refresh": self.ui.suspend_refresh_checkbox.isChecked(),
+            "optimize_commands": self.ui.optimize_commands_checkbox.isChecked(),
+            "modifier_set_attr": self.ui.modifier_set_attr_checkbox.isChecked(),
+            "benchmark": self.ui.benchmark_checkbox.isChecked(),
+            "api_transforms": self.ui.api_transforms_checkbox.isChecked(),
+            "random_seed": self.ui.random_seed_spinbox.value() if self.ui.random_seed_spinbox.value() >= 0 else None, #-1はシードなし
+            "iteration_order": self.ui.iteration_order_dropdown.currentIndex(),
+            "order_point": self.order_point(),
+            "grid_cell_size": self.ui.grid_cell_size_spinbox.value(),
+        }
+
+    def order_point(self):
+        try:
+            order_point = tuple(float(value) for value in self.ui.order_point_input_box.text().replace(",", " ").split())
+        except ValueError:
+            return None
+        return order_point if len(order_point) == 3 else None
+
+    def build_recording(self):
         mel_records_obj = self.ui.mel_command_capture_list
-        mel_records = [mel_records_obj.item(idx).text() for idx in range(0, mel_records_obj.count())]
-        for mel_command in mel_records:
-            if mel_command == "": 
-                continue
-            elif mel_command.startswith("// "):
-                mel_command = mel_command.lstrip("// ")
-                newly_generated_node = mel_command
-                generated_nodes.append(newly_generated_node)
-                python_script_ls[-1] = f"new_node_{generated_node_index} = " + python_script_ls[-1]
-                generated_node_index += 1
-            else:
-                if generated_nodes: #生成されたノードがある場合、メルコマンド内のノード名を置換
-                    i = 0
-                    while i < len(generated_nodes):
-                        generated_node = generated_nodes[i]
-                        if generated_node in mel_command: 
-                            mel_command = mel_command.replace(generated_node, "{new_node_" + str(i) + "[0]}") #変数に置換
-                        i += 1
-                if self.operating_mesh in mel_command: #操作対象メッシュ名を変数に置換  
-                    mel_command = mel_command.replace(self.operating_mesh, "{" + "obj}")
-                if "\"" in mel_command:  #ダブルクオーテーションが含まれる場合、エスケープ処理  
-                    mel_command = mel_command.replace("\"", "\\\"")
-                python_command = f"mel.eval(f\"{mel_command}\")" #メルコマンドをPythonコードに変換
-                python_script_ls.append(python_command)
-        return python_script_ls
-    
-    def write_py(self, py, indentaion):
-        self.ui.generated_python_script_view.appendPlainText("    " * indentaion + py)
+        commands = [
+            RecordedCommand(mel_records_obj.item(idx).text(), list(self.variable_of_line_record_dict.get(idx, [])))
+            for idx in range(0, mel_records_obj.count())
+        ]
+        parameters = []
+        for variable in self.variable_name_dict:
+            random_range = None
+            if variable in self.random_variable_dict:
+                random_range = tuple(float(value) for value in self.random_variable_dict[variable].split(","))
+            parameters.append(ParameterSpec(
+                variable,
+                self.variable_name_dict[variable],
+                self.variable_original_value_dict.get(variable, ""),
+                self.variable_iteration_dict.get(variable),
+                random_range,
+                self.field_variable_dict.get(variable),
+            ))
+        return Recording(commands, parameters, self.operating_mesh)
+
+    def load_recording(self, recording):
+        #保存された記録からリストと変数の辞書を復元
+        self.ui.mel_command_capture_list.clear()
+        self.ui.mel_command_capture_list.addItems(recording.mel_records)
+        self.variable_name_dict.clear()
+        self.variable_original_value_dict.clear()
+        self.variable_iteration_dict.clear()
+        self.random_variable_dict.clear()
+        self.field_variable_dict.clear()
+        self.variable_of_line_record_dict.clear()
+        for line_index, command in enumerate(recording.commands):
+            if command.variables:
+                self.variable_of_line_record_dict[line_index] = list(command.variables)
+        for parameter in recording.parameters:
+            self.variable_name_dict[parameter.name] = parameter.var_type
+            self.variable_original_value_dict[parameter.name] = parameter.original_line
+            if parameter.iteration is not None:
+                self.variable_iteration_dict[parameter.name] = parameter.iteration
+            if parameter.random_range is not None:
+                self.random_variable_dict[parameter.name] = f"{parameter.random_range[0]}, {parameter.random_range[1]}"
+            if parameter.field is not None:
+                self.field_variable_dict[parameter.name] = parameter.field
+        self.operating_mesh = recording.operating_mesh
+        self.ui.generate_ui_checkbox.setChecked(bool(self.variable_name_dict))
+
+    def script_generator(self):
+        return ScriptGenerator(self.build_recording(), self.script_name, self.generation_options())
+
+    def show_optimization_result(self, script_generator):
+        if script_generator.removed_command_count:
+            self.ui.optimization_result_label.setText(f"Optimizer removed {script_generator.removed_command_count} commands")
+        else:
+            self.ui.optimization_result_label.setText("")
 
     def generate_python_script_noui(self):
-        python_script_ls = self.generate_python_fucntion()
-        self.ui.generated_python_script_view.setPlainText("from maya import mel as mel")
-        if self.random_variable_dict:
-            self.write_py("import random")
-        self.write_py("", 0)
-        if self.variable_iteration_dict:
-            self.write_py("def operation(i, obj):", 0)
-        else:
-            self.write_py("def operation(obj):", 0)
-        for variable in self.variable_iteration_dict:
-            self.write_py(f"{variable} = {self.variable_iteration_dict[variable]}", 1)
-        for variable in self.random_variable_dict:
-            self.write_py(f"{variable} = random.uniform({self.random_variable_dict[variable]})", 1)
-        self.write_py("", 1)
-        for python_line in python_script_ls:
-            self.write_py(python_line, 1)
-        self.write_py("", 0)
-        self.write_py("def main():", 0)
-        self.write_py("selected_objects = cmds.ls(selection=True)", 1)
-        self.write_py("if selected_objects:", 1)
-        self.write_py("for obj in selected_objects:", 2)
-        if self.variable_iteration_dict:
-            self.write_py("i = selected_objects.index(obj)", 3)
-        self.write_py("cmds.select(obj, replace=True)", 3)
-        if self.variable_iteration_dict:
-            self.write_py("operation(i, obj)", 3) 
-        else:
-            self.write_py("operation(obj)", 3) 
-        self.write_py("", 0)
-        self.write_py("main()", 0)
+        script_generator = self.script_generator()
+        python_script = script_generator.generate_python_script_noui() #スクリプト全体を生成してから一度だけ表示を更新
+        self.ui.generated_python_script_view.setPlainText(python_script)
+        self.show_optimization_result(script_generator)
 
     def generate_python_script_wui(self):
-        python_script_ls = self.generate_python_fucntion()
-        self.ui.generated_python_script_view.setPlainText("from maya import cmds as cmds")
-        self.write_py("from maya import mel as mel", 0)
-        if self.random_variable_dict:
-            self.write_py("import random", 0)
-        self.write_py("", 0)
-        self.write_py("def main(*args):", 0)
-        if self.variable_iteration_dict:
-            self.write_py("def operation(i, obj):", 1)
-        else:
-            self.write_py("def operation(obj):", 1)
-        for variable in self.variable_name_dict:
-            if variable not in self.variable_iteration_dict and variable not in self.random_variable_dict:
-                self.write_py(f"{variable} = {self.variable_name_dict[variable]}(cmds.textField(\"{variable}\", q=True, text=True))", 2)
-            else:
-                if variable in self.variable_iteration_dict:
-                    self.write_py(f"{variable} = {self.variable_iteration_dict[variable]}", 2)
-                elif variable in self.random_variable_dict:
-                    self.write_py(f"{variable} = random.uniform({self.random_variable_dict[variable]})", 2)
-        for python_line in python_script_ls:
-            self.write_py(python_line, 2)
-        self.write_py("", 1)
-        self.write_py("def myfunction(*args):", 1)
-        self.write_py("selected_objects = cmds.ls(selection=True)", 2)
-        self.write_py("if selected_objects:", 2)
-        self.write_py("for obj in selected_objects:", 3)
-        if self.variable_iteration_dict:
-            self.write_py("i = selected_objects.index(obj)", 4)
-        self.write_py("cmds.select(obj, replace=True)", 4)
-        if self.variable_iteration_dict:
-            self.write_py("operation(i, obj)", 4) 
-        else:
-            self.write_py("operation(obj)", 4) 
-        self.write_py("", 1)
-        self.write_py(f"title = \"{self.script_name}\"", 1)
-        self.write_py("if cmds.window(title, exists=True):", 1)
-        self.write_py("cmds.deleteUI(title)", 2)
-        self.write_py("GUI = cmds.window(title, title=title, w=450, h=430, s=True)", 1)
-        self.write_py(f"cmds.columnLayout(columnAttach=('both', {1+len(self.variable_name_dict)}), rowSpacing=10, columnWidth=500)", 1)
-        self.write_py("", 1)
-        self.write_py("cmds.rowLayout(nc=2, cw2=[100,100])", 1)
-        self.write_py("cmds.text(\" \")", 1)
-        self.write_py("cmds.button(label=\"Run\", c=myfunction, width=100)", 1)
-        self.write_py("cmds.setParent(\"..\")", 1)
-        self.write_py("", 1)
-        if self.variable_name_dict != {}:
-            for variable in self.variable_name_dict:
-                if variable not in self.variable_iteration_dict and variable not in self.random_variable_dict:
-                    self.write_py("cmds.rowLayout(nc=2, cw2=[100,100])", 1)
-                    self.write_py(f"cmds.text(\"{variable}\")", 1)
-                    self.write_py(f"cmds.textField(\"{variable}\", text=None, w=100)", 1)
-                    self.write_py("cmds.setParent(\"..\")", 1)
-        self.write_py("", 1)
-        self.write_py("cmds.showWindow(GUI)", 1)
-        self.write_py("", 0)
-        self.write_py("main()", 0)
+        try:
+            script_generator = self.script_generator()
+        except IterationExpressionError as error: #以前のバージョンで保存された式に使えない構文が含まれる場合
+            self.ui.generation_warning_label.setText(f"Invalid iteration expression: {error}")
+            return
+        python_script = script_generator.generate_python_script_wui()
+        self.ui.generated_python_script_view.setPlainText(python_script)
+        self.show_optimization_result(script_generator)
 
     def generate_python_script(self):
         self.script_name = self.ui.name_script_input_box.text()
         if self.script_name == "":
             self.ui.generation_warning_label.setText("Name your script")
             return
+        if self.order_point() is None:
+            self.ui.generation_warning_label.setText("Input the order point as three numbers (x y z)")
+            return
         if self.ui.generate_ui_checkbox.isChecked():
-            if self.variable_iteration_dict or self.random_variable:
+            if self.variable_iteration_dict or self.random_variable_dict or self.field_variable_dict:
                 self.ui.generation_warning_label.setText("Note that randomized and iterating variables cannot be set from UI")
             self.ui.generation_warning_label.setText("")
             self.generate_python_script_wui()
@@ -526,10 +777,15 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
                 self.is_overwrite_confirm = False
                 if os.path.exists(save_path):
                     os.unlink(save_path)
+                recording_path = os.path.join(save_dir, f"{script_name}{RECORDING_FILE_SUFFIX}")
+                if os.path.exists(recording_path):
+                    os.unlink(recording_path)
                 del self.data_storage_dict[script_name]
         python_script_generated = self.ui.generated_python_script_view.toPlainText()
         with open(save_path, "w", encoding="utf-8") as py_file:
             py_file.write(python_script_generated)
+        if self.ui.mel_command_capture_list.count():
+            self.build_recording().save(os.path.join(save_dir, f"{script_name}{RECORDING_FILE_SUFFIX}")) #再生成できるよう記録も保存
         self.store_data(script_name, save_dir)
         self.ui.save_warning_label.setText("Saved successfully")
         self.ui.save_warning_label.setStyleSheet("color: #98FBCB")
@@ -584,6 +840,9 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
         selected_script_path = os.path.join(self.data_storage_dict[selected_script], f"{selected_script}.py")
         if os.path.exists(selected_script_path):
             os.unlink(selected_script_path)
+        recording_path = os.path.join(self.data_storage_dict[selected_script], f"{selected_script}{RECORDING_FILE_SUFFIX}")
+        if os.path.exists(recording_path):
+            os.unlink(recording_path)
         del self.data_storage_dict[selected_script]
         data_storage_path = cmds.getAttr("autoscripting_node.autoscripting_data")
         with open(data_storage_path, "w") as data_storage:
@@ -600,6 +859,12 @@ class CustomMayaUI(MayaQWidgetBaseMixin, QWidget):
             return
         with open(selected_script_path, "r", encoding="utf-8") as script_file:
             script_content = script_file.read()
+        recording_path = os.path.join(self.data_storage_dict[selected_script], f"{selected_script}{RECORDING_FILE_SUFFIX}")
+        if os.path.exists(recording_path):
+            try:
+                self.load_recording(Recording.load(recording_path)) #記録があれば生成済みのPythonを解析せずに編集を再開
+            except (ValueError, KeyError) as e:
+                self.ui.run_error_label.setText(f"Recording could not be loaded : {str(e)}")
         self.ui.script_directory_input_box.setText(self.data_storage_dict[selected_script])
         self.ui.name_script_input_box.setText(selected_script)
         self.ui.generated_python_script_view.setPlainText(script_content)
@@ -0,0 +1,161 @@
+import sys
+import time
+import types
+
+from recording_ir import ParameterSpec, RecordedCommand, Recording
+from script_generator import ScriptGenerator
+
+SAMPLE_RECORDING = [
+    "polyExtrudeFacet -constructionHistory 1 -keepFacesTogether 1 -pvx 0 -pvy 0.5 -pvz 0 -divisions 1 -twist 0 -taper 1 -off 0 -thickness 0 -smoothingAngle 30 pCube1.f[1];",
+    "setAttr \"pCube1.translateY\" 2.5;",
+    "move -r -os -wd 0 1.5 0 ;",
+    "rotate -r -os -fo 0 45 0 ;",
+    "scale -r 1.2 1.2 1.2 ;",
+    "polyBevel3 -fraction 0.2 -offsetAsFraction 1 -autoFit 1 -depth 1 -mitering 0 -miterAlong 0 -chamfer 1 -segments 2 -worldSpace 1 -smoothingAngle 30 -subdivideNgons 1 -mergeVertices 1 -mergeVertexTolerance 0.0001 -miteringAngle 180 -angleTolerance 180 -ch 1 pCube1.e[4:7];",
+    "polySoftEdge -a 30 -ch 1 pCube1;",
+]
+TRANSFORM_RECORDING = [
+    "move -r 0 1.5 0 ;",
+    "move -r -ls 0.5 0 -2 ;",
+    "rotate -r -eu 0 45 0 ;",
+    "rotate -a -os 10 20 30 ;",
+    "scale -r 1.2 0.8 1.2 ;",
+    "xform -ws -t 3 2 1 ;",
+    "xform -r -t 0 0 1 ;",
+]
+
+
+class StandInCmds(types.ModuleType):
+    #maya.cmdsの代わりに呼び出しを記録するだけのモジュール
+    def __init__(self, selected_objects):
+        super().__init__("maya.cmds")
+        self.selected_objects = selected_objects
+        self.call_count = 0
+        self.calls = [] #(コマンド名, 引数, フラグ)、テストで呼び出し順を確かめる
+
+    def ls(self, *args, **kwargs):
+        if args: #UUIDの代わりに名前をそのまま使う
+            return list(args[0]) if isinstance(args[0], list) else [args[0]]
+        return list(self.selected_objects)
+
+    def xform(self, *args, **kwargs):
+        self.call_count += 1
+        if kwargs.get("q"): #位置の問い合わせには名前ごとに原点を返す
+            return [0.0, 0.0, 0.0] * (len(args[0]) if isinstance(args[0], list) else 1)
+        return None
+
+    def __getattr__(self, command_name):
+        if command_name.startswith("__"):
+            raise AttributeError(command_name)
+        def command(*args, **kwargs):
+            self.call_count += 1
+            self.calls.append((command_name, args, kwargs))
+            return [command_name + "1"]
+        setattr(self, command_name, command)
+        return command
+
+
+class StandInMel(types.ModuleType):
+    #mel.evalの代わりに、解析せずコマンド名だけでcmdsに渡す(MELの解析コストは計測に含めない)
+    def __init__(self, cmds):
+        super().__init__("maya.mel")
+        self.cmds = cmds
+
+    def eval(self, mel_command):
+        return getattr(self.cmds, mel_command.split(None, 1)[0])()
+
+
+def install_stand_in_maya(object_count):
+    cmds = StandInCmds([f"pCube{index}" for index in range(object_count)])
+    maya = types.ModuleType("maya")
+    maya.cmds = cmds
+    maya.mel = StandInMel(cmds)
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = maya.cmds
+    sys.modules["maya.mel"] = maya.mel
+    return cmds
+
+
+def time_generation(mel_records):
+    start = time.perf_counter()
+    python_script = ScriptGenerator(Recording.from_mel_records(mel_records, "pCube1")).generate_python_script_noui()
+    return time.perf_counter() - start, python_script
+
+
+def time_expression(expression_text, object_count):
+    #生成スクリプトのparameter_tableで全オブジェクト分の値を計算する時間
+    recording = Recording([RecordedCommand("move -r 0 {offset} 0 ;", ["offset"])], [ParameterSpec("offset", "float", "move -r 0 1 0 ;", iteration=expression_text)], "pCube1")
+    python_script = ScriptGenerator(recording).generate_python_script_noui()
+    cmds = install_stand_in_maya(object_count)
+    generated = {"__name__": "generated"}
+    exec(compile(python_script, "<generated>", "exec"), generated)
+    selected_objects = cmds.ls()
+    start = time.perf_counter()
+    generated["parameter_table"](selected_objects)
+    return time.perf_counter() - start
+
+
+def time_replay(options, object_count):
+    python_script = ScriptGenerator(Recording.from_mel_records(SAMPLE_RECORDING, "pCube1"), options=options).generate_python_script_noui()
+    cmds = install_stand_in_maya(object_count)
+    code = compile(python_script, "<generated>", "exec")
+    start = time.perf_counter()
+    exec(code, {"__name__": "generated"}) #生成スクリプトは最後にmain()を呼ぶ
+    elapsed = time.perf_counter() - start
+    return elapsed / object_count, cmds.call_count
+
+
+def compare_transform_replay(object_count=200, tolerance=1e-6):
+    #mayapyで実行し、OpenMayaでの適用とcmdsでの適用の結果と速度を比べる
+    import maya.standalone
+    try:
+        maya.standalone.initialize()
+    except RuntimeError:
+        pass #Mayaの中から呼ばれた場合
+    from maya import cmds
+    world_matrices = []
+    for options in ({"api_transforms": False}, {"api_transforms": True}):
+        cmds.file(new=True, force=True)
+        objects = []
+        for index in range(object_count):
+            obj = cmds.polyCube()[0]
+            cmds.xform(obj, t=(index, index * 0.5, 0), ro=(index * 7, 0, index * 3), s=(1, 1 + index * 0.01, 1))
+            if index % 2:
+                cmds.setAttr(obj + ".rotateOrder", 3)
+                cmds.parent(obj, cmds.group(empty=True)) #親の変換がある場合
+            objects.append(obj)
+        cmds.select(objects, replace=True)
+        python_script = ScriptGenerator(Recording.from_mel_records(TRANSFORM_RECORDING, objects[0]), options=options).generate_python_script_noui()
+        code = compile(python_script, "<generated>", "exec")
+        start = time.perf_counter()
+        exec(code, {"__name__": "generated"})
+        elapsed = time.perf_counter() - start
+        world_matrices.append([cmds.xform(obj, q=True, matrix=True, worldSpace=True) for obj in objects])
+        print(f"{'api' if options['api_transforms'] else 'cmds'} transforms : {elapsed / object_count * 1e6:8.2f} us/object")
+    mismatches = [
+        obj_index for obj_index, (cmds_matrix, api_matrix) in enumerate(zip(*world_matrices))
+        if max(abs(a - b) for a, b in zip(cmds_matrix, api_matrix)) > tolerance
+    ]
+    print(f"mismatched objects: {len(mismatches)} / {object_count}")
+    return not mismatches
+
+
+def main(object_count=20000):
+    generation_time, _ = time_generation(SAMPLE_RECORDING * 5000)
+    print(f"generation      : {generation_time * 1e3:8.2f} ms for {len(SAMPLE_RECORDING) * 5000} commands")
+    #スタンドインでの時間は生成コードの呼び出し回数の目安で、Maya上の速度ではない(Mayaでは--compare-transformsで比べる)
+    mel_time, mel_calls = time_replay({"transpile_commands": False, "batch_commands": False}, object_count)
+    cmds_time, cmds_calls = time_replay({"batch_commands": False}, object_count)
+    batched_time, batched_calls = time_replay({}, object_count)
+    print(f"objects: {object_count}, commands per object: {len(SAMPLE_RECORDING)}")
+    print(f"mel.eval replay : {mel_time * 1e6:8.2f} us/object ({mel_calls} calls)")
+    print(f"cmds replay     : {cmds_time * 1e6:8.2f} us/object ({cmds_calls} calls)")
+    print(f"batched replay  : {batched_time * 1e6:8.2f} us/object ({batched_calls} calls)")
+    expression_time = time_expression("1.0 + (i * (sin(i / n * tau) + sqrt(x * x + z * z)))", 100000)
+    print(f"expression      : {expression_time * 1e3:8.2f} ms for 100000 objects")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--compare-transforms": #mayapy benchmark_replay.py --compare-transforms
+        sys.exit(0 if compare_transform_replay() else 1)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,207 @@
+from recording_ir import RecordedCommand, Recording
+
+try:
+    import maya.api.OpenMaya as om
+    from maya import cmds
+except ImportError: #Mayaの外ではLocalEventSourceだけを使う
+    om = None
+    cmds = None
+
+NODE_EVENT = "node"
+PLUG_EVENT = "plug"
+#LocalEventSourceで記録するノードの種類(Mayaではトランスフォームかどうかで判定)
+TRANSFORM_NODE_TYPES = {"transform", "joint"}
+
+
+def mel_string_literal(text):
+    return "\"" + text.replace("\\", "\\\\").replace("\"", "\\\"") + "\""
+
+
+def mel_value_arguments(value):
+    #getAttrの戻り値をsetAttrの引数に変換する(対応しない型はNone)
+    if isinstance(value, bool):
+        return [str(int(value))]
+    if isinstance(value, (int, float)):
+        return [repr(value)]
+    if isinstance(value, str):
+        return ["-type", "\"string\"", mel_string_literal(value)]
+    if isinstance(value, (list, tuple)):
+        if len(value) == 1 and isinstance(value[0], (list, tuple)): #translateなどの複合アトリビュートは[(x, y, z)]で返る
+            value = value[0]
+        if value and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+            return [repr(item) for item in value]
+    return None
+
+
+class CallbackRecorder:
+    def __init__(self, event_source, operating_mesh=None):
+        self.event_source = event_source
+        self.operating_mesh = operating_mesh
+        self.events = {} #イベントのキー -> (種類, ハンドル)、同じプラグの変更は最初の位置に一つだけ残す
+        self.is_recording = False
+
+    def start(self):
+        self.events = {}
+        self.resume()
+
+    def pause(self):
+        if self.is_recording:
+            self.event_source.stop()
+            self.is_recording = False
+
+    def resume(self):
+        if not self.is_recording:
+            self.event_source.start(self)
+            self.is_recording = True
+
+    def node_added(self, node_key, node_handle):
+        self.events.setdefault((NODE_EVENT, node_key), (NODE_EVENT, node_handle))
+
+    def attribute_changed(self, plug_key, plug_handle):
+        self.events.setdefault((PLUG_EVENT, plug_key), (PLUG_EVENT, plug_handle))
+
+    def recorded_commands(self):
+        #値は記録終了時にまとめて読むので、ドラッグ中の途中の値は記録されない
+        recorded_commands = []
+        for event_kind, handle in self.events.values():
+            if event_kind == NODE_EVENT:
+                node = self.event_source.describe_node(handle)
+                if node is None:
+                    continue #記録中に削除されたノード
+                node_name, node_type, parent_name = node
+                parent_argument = f" -p {mel_string_literal(parent_name)}" if parent_name is not None else ""
+                recorded_commands.append(RecordedCommand(f"createNode {node_type} -n {mel_string_literal(node_name.split('|')[-1])}{parent_argument};"))
+                recorded_commands.append(RecordedCommand(f"// Result: {node_name} //"))
+            else:
+                plug = self.event_source.describe_plug(handle)
+                if plug is None:
+                    continue
+                plug_name, value = plug
+                value_arguments = mel_value_arguments(value)
+                if value_arguments is None:
+                    continue
+                recorded_commands.append(RecordedCommand(f"setAttr {mel_string_literal(plug_name)} " + " ".join(value_arguments) + ";"))
+        return recorded_commands
+
+    def stop(self):
+        self.pause()
+        return Recording(self.recorded_commands(), [], self.operating_mesh)
+
+
+class LocalEventSource:
+    #Mayaなしで記録処理を確かめるためのイベント発生源
+    def __init__(self):
+        self.recorder = None
+        self.nodes = {}
+        self.plug_values = {}
+        self.unrecorded_nodes = set() #記録しないノード(アトリビュート変更も記録しない)
+
+    def start(self, recorder):
+        self.recorder = recorder
+
+    def stop(self):
+        self.recorder = None
+
+    def add_node(self, node_name, node_type, parent_name=None):
+        self.nodes[node_name] = (node_type, parent_name)
+        if node_type not in TRANSFORM_NODE_TYPES: #シェイプやヒストリは作成コマンドの副産物なので記録しない
+            self.unrecorded_nodes.add(node_name)
+        elif self.recorder is not None:
+            self.recorder.node_added(node_name, node_name)
+
+    def delete_node(self, node_name):
+        self.nodes.pop(node_name, None)
+        for plug_name in [plug_name for plug_name in self.plug_values if plug_name.split(".")[0] == node_name]:
+            del self.plug_values[plug_name]
+
+    def set_attribute(self, plug_name, value):
+        self.plug_values[plug_name] = value
+        if self.recorder is not None and plug_name.split(".")[0] not in self.unrecorded_nodes:
+            self.recorder.attribute_changed(plug_name, plug_name)
+
+    def describe_node(self, node_name):
+        if node_name not in self.nodes:
+            return None
+        node_type, parent_name = self.nodes[node_name]
+        return node_name, node_type, parent_name
+
+    def describe_plug(self, plug_name):
+        if plug_name not in self.plug_values:
+            return None
+        return plug_name, self.plug_values[plug_name]
+
+
+class MayaEventSource:
+    #ノード追加とアトリビュート変更のコールバックで記録する
+    def __init__(self, watched_nodes):
+        self.watched_nodes = watched_nodes #記録開始時に選択されていたノード(ヒストリも監視する)
+        self.recorder = None
+        self.callback_ids = []
+        self.watched_handles = set()
+
+    def start(self, recorder):
+        self.recorder = recorder
+        self.watched_handles = set()
+        self.callback_ids = [om.MDGMessage.addNodeAddedCallback(self.on_node_added, "transform")]
+        selection_list = om.MSelectionList()
+        if self.watched_nodes:
+            watched_node_names = set(self.watched_nodes)
+            watched_node_names.update(cmds.listHistory(self.watched_nodes) or [])
+            watched_node_names.update(cmds.listRelatives(self.watched_nodes, shapes=True, fullPath=True) or [])
+            for node_name in watched_node_names:
+                selection_list.add(node_name)
+        for index in range(selection_list.length()):
+            self.watch_node(selection_list.getDependNode(index))
+
+    def stop(self):
+        if self.callback_ids:
+            om.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = []
+        self.recorder = None
+
+    def watch_node(self, node):
+        node_handle = om.MObjectHandle(node)
+        if node_handle.hashCode() in self.watched_handles:
+            return
+        self.watched_handles.add(node_handle.hashCode())
+        self.callback_ids.append(om.MNodeMessage.addAttributeChangedCallback(node, self.on_attribute_changed))
+
+    def on_node_added(self, node, client_data):
+        if self.recorder is None or not node.hasFn(om.MFn.kTransform):
+            return #シェイプやヒストリなど作成コマンドの副産物は、再生すると接続のない重複ノードになるので記録しない(監視もしない)
+        node_handle = om.MObjectHandle(node)
+        self.recorder.node_added(node_handle.hashCode(), node_handle) #名前は作成直後に変わることがあるので終了時に読む
+        self.watch_node(node)
+
+    def on_attribute_changed(self, message, plug, other_plug, client_data):
+        if self.recorder is None or not message & om.MNodeMessage.kAttributeSet:
+            return
+        node_handle = om.MObjectHandle(plug.node())
+        attribute_name = plug.partialName(useLongNames=True, includeInstancedIndices=True)
+        self.recorder.attribute_changed((node_handle.hashCode(), attribute_name), (node_handle, attribute_name))
+
+    def node_name(self, node):
+        if node.hasFn(om.MFn.kDagNode):
+            return om.MFnDagNode(node).partialPathName() #同名のノードがあっても一意になるパス
+        return om.MFnDependencyNode(node).name()
+
+    def describe_node(self, node_handle):
+        if not node_handle.isValid():
+            return None
+        node = node_handle.object()
+        parent_name = None
+        if node.hasFn(om.MFn.kDagNode) and om.MFnDagNode(node).parentCount():
+            parent = om.MFnDagNode(node).parent(0)
+            if not parent.hasFn(om.MFn.kWorld): #ワールド直下のノードは親を指定しない
+                parent_name = self.node_name(parent)
+        return self.node_name(node), om.MFnDependencyNode(node).typeName, parent_name
+
+    def describe_plug(self, plug_handle):
+        node_handle, attribute_name = plug_handle
+        if not node_handle.isValid():
+            return None
+        plug_name = self.node_name(node_handle.object()) + "." + attribute_name
+        try:
+            return plug_name, cmds.getAttr(plug_name)
+        except (RuntimeError, ValueError):
+            return None
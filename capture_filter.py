@@ -0,0 +1,116 @@
+import json
+import os
+import re
+
+CAPTURE_FILTER_FILE_NAME = "autoscripting_capture_filter.json"
+STOP = "stop"
+INCLUDE = "include"
+EXCLUDE = "exclude"
+RULE_CATEGORIES = (STOP, INCLUDE, EXCLUDE) #一つの行に複数の規則が当てはまる場合はこの順で優先
+
+DEFAULT_CAPTURE_RULES = {
+    STOP: [{"prefix": "import"}], #実行されたこのツールのスクリプト以降は記録しない
+    INCLUDE: [],
+    EXCLUDE: [
+        {"command": "select"},
+        {"command": "hilite"},
+        {"command": "changeSelectMode"},
+        {"command": "displaySmoothness"},
+        {"command": "selectMode"},
+        {"command": "selectType"},
+        {"command": "selectPref"},
+        {"command": "setToolTo"},
+        {"command": "modelEditor"},
+        {"command": "outlinerEditor"},
+        {"command": "workspaceControl"},
+        {"command": "scriptEditorInfo"},
+        {"command": "optionVar"},
+        {"command": "autoUpdateAttrEd"},
+        {"command": "buildObjectMenuItemsNow"},
+    ],
+}
+
+
+#Echo All Commandsの履歴に含まれる、シーンを変更しない問い合わせ・UI・ラッパーのコマンド
+ECHO_NOISE_COMMANDS = [
+    "ls", "getAttr", "objExists", "attributeQuery", "attributeExists", "nodeType", "objectType", "listRelatives",
+    "listConnections", "listHistory", "listAttr", "filterExpand", "pluginInfo", "about", "exists", "whatIs",
+    "currentTime", "getPanel", "menuItem", "menu", "popupMenu", "setParent", "window", "showWindow", "deleteUI",
+    "control", "layout", "button", "checkBox", "text", "textField", "floatField", "intField", "optionMenu",
+    "iconTextButton", "formLayout", "columnLayout", "rowLayout", "frameLayout", "scrollLayout", "progressBar",
+    "waitCursor", "evalDeferred", "scriptJob", "headsUpDisplay", "inViewMessage",
+]
+#Echo All Commandsのときに除外規則の最後に加える(結果などのコメント行には当てはめない)
+ECHO_NOISE_RULE = (
+    r"(?!//)(?:(?:" + "|".join(re.escape(command) for command in ECHO_NOISE_COMMANDS) + r")(?![\w])"
+    r"|perform\w*|build\w*|\w+Update(?![\w])" #メニューから実行したときのラッパーの中身も別に記録される
+    r"|[^;]*?\s-(?:q|query)(?![\w]))" #問い合わせ
+)
+
+
+def rule_pattern(rule):
+    if "prefix" in rule:
+        return re.escape(rule["prefix"])
+    if "command" in rule:
+        return re.escape(rule["command"]) + r"(?![\w])" #pCube1のような名前の一部には当てはまらないように
+    if "regex" in rule:
+        re.compile(rule["regex"]) #規則ごとに単独でコンパイルし、設定ファイルの誤りはここで報告
+        return r".*?(?:" + rule["regex"] + r")"
+    raise ValueError(f"Unknown capture filter rule: {rule}")
+
+
+class CaptureFilter:
+    def __init__(self, rules=None, exclude_echo_noise=False):
+        self.rules = rules if rules is not None else DEFAULT_CAPTURE_RULES
+        self.exclude_echo_noise = exclude_echo_noise
+        self.grouped_rules = [] #グループや後方参照を含む正規表現は結合すると番号がずれるので単独で照合する(種類, パターン)
+        alternatives = []
+        for category in RULE_CATEGORIES:
+            patterns = []
+            for rule in self.rules.get(category, []):
+                pattern = rule_pattern(rule)
+                if "regex" in rule and re.compile(rule["regex"]).groups:
+                    self.grouped_rules.append((category, re.compile(r"\s*" + pattern)))
+                else:
+                    patterns.append(pattern)
+            if category == EXCLUDE and exclude_echo_noise:
+                patterns.append(ECHO_NOISE_RULE) #含める規則に当てはまる行は除外しない
+            if patterns:
+                alternatives.append(f"(?P<{category}>" + "|".join(patterns) + ")")
+        #全規則を優先順に並べた一つの正規表現にまとめ、各行を一回の照合で分類する
+        self.matcher = re.compile(r"\s*(?:" + "|".join(alternatives) + ")") if alternatives else None
+
+    def classify(self, mel_record):
+        category = None
+        if self.matcher is not None:
+            match = self.matcher.match(mel_record)
+            if match is not None:
+                category = match.lastgroup #選択肢は優先順なので最初に当てはまった種類になる
+        for rule_category, pattern in self.grouped_rules:
+            if (category is None or RULE_CATEGORIES.index(rule_category) < RULE_CATEGORIES.index(category)) and pattern.match(mel_record):
+                category = rule_category
+        return category
+
+    def is_excluded(self, mel_record):
+        return self.classify(mel_record) == EXCLUDE
+
+
+def merge_capture_rules(base_rules, extra_rules):
+    rules = {category: list(base_rules.get(category, [])) for category in RULE_CATEGORIES}
+    for category in RULE_CATEGORIES:
+        rules[category].extend(extra_rules.get(category, []))
+    return rules
+
+
+def load_capture_filter(config_paths):
+    #既定の規則にユーザーごと・プロジェクトごとの設定を順に追加する
+    rules = DEFAULT_CAPTURE_RULES
+    for config_path in config_paths:
+        if not config_path or not os.path.exists(config_path):
+            continue
+        with open(config_path, "r", encoding="utf-8") as config_file:
+            config = json.load(config_file)
+        if not config.get("use_default_rules", True):
+            rules = {}
+        rules = merge_capture_rules(rules, config)
+    return CaptureFilter(rules)
@@ -0,0 +1,39 @@
+FIELD_RAMP = "ramp"
+FIELD_NOISE = "noise"
+FIELD_CURVE = "curve"
+FIELD_KINDS = (FIELD_RAMP, FIELD_NOISE, FIELD_CURVE) #UIのドロップダウンと同じ順
+DEFAULT_NOISE_FREQUENCY = 0.1
+
+
+def parse_curve_points(text):
+    #"0 0, 0.5 1, 1 0" のような (位置 値) の組を位置順に並べて返す
+    points = []
+    for point_text in text.split(","):
+        values = [float(value) for value in point_text.split()]
+        if len(values) != 2:
+            raise ValueError(f"Curve points must be pairs of numbers: {point_text.strip()}")
+        points.append(values)
+    if len(points) < 2:
+        raise ValueError("A curve needs at least two points")
+    points.sort(key=lambda point: point[0])
+    return points
+
+
+def make_field(kind, value_from, value_to, parameter_text=""):
+    #UIの入力からフィールドの設定を作る(不正な入力はValueError)
+    field = {"kind": kind, "range": [float(value_from), float(value_to)]}
+    if kind == FIELD_NOISE:
+        field["frequency"] = float(parameter_text) if parameter_text.strip() else DEFAULT_NOISE_FREQUENCY
+    elif kind == FIELD_CURVE:
+        field["points"] = parse_curve_points(parameter_text)
+    elif kind != FIELD_RAMP:
+        raise ValueError(f"Unknown field kind: {kind}")
+    return field
+
+
+def field_uses_position(field):
+    return field["kind"] == FIELD_NOISE
+
+
+def field_uses_ramp(field):
+    return field["kind"] in (FIELD_RAMP, FIELD_CURVE)
@@ -0,0 +1,205 @@
+import os
+import re
+from collections import deque
+
+from capture_filter import EXCLUDE, STOP, CaptureFilter
+from mel_parser import parse_mel_line
+
+MAX_OPEN_RECORD_LENGTH = 16384
+DEFAULT_RECENT_COMMAND_COUNT = 200
+UNDO_COMMANDS = {"undo": "undo", "Undo": "undo", "redo": "redo", "Redo": "redo"}
+UNDO_ECHO_PATTERN = re.compile(r"//\s*(Undo|Redo):\s*(.*?)\s*(?://)?\s*$")
+
+
+class HistoryTailer:
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0 #読み込み済みのバイト位置
+        self.pending = b"" #改行前で途切れた行の一時保存
+
+    def skip_to_end(self):
+        #既に書き込まれている履歴は読まずに、これ以降の行だけを読む
+        self.offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.pending = b""
+
+    def read_new_lines(self):
+        if not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) < self.offset: #ファイルが作り直された場合は先頭から読み直す
+            self.offset = 0
+            self.pending = b""
+        with open(self.path, "rb") as history_file:
+            history_file.seek(self.offset)
+            for raw_line in history_file: #一行ずつ読むのでメモリ使用量は一定
+                self.offset += len(raw_line)
+                if not raw_line.endswith(b"\n"):
+                    self.pending += raw_line #Mayaが書き込み途中の行は次回に回す
+                    continue
+                line = (self.pending + raw_line).decode("utf-8", errors="replace")
+                self.pending = b""
+                yield line.rstrip("\r\n")
+
+
+def undo_command(mel_record):
+    mel_line = parse_mel_line(mel_record)
+    if len(mel_line.statements) != 1 or mel_line.statements[0].arguments:
+        return None
+    return UNDO_COMMANDS.get(mel_line.statements[0].command)
+
+
+class CaptureSession:
+    stops_capture = True #停止の規則に当てはまる行で記録を終える
+
+    def __init__(self, path, capture_filter=None, echo_all_commands=False):
+        self.tailer = HistoryTailer(path)
+        self.capture_filter = capture_filter or CaptureFilter()
+        if echo_all_commands: #問い合わせ・UIコマンドの除外も同じ一回の照合で行う
+            self.capture_filter = CaptureFilter(self.capture_filter.rules, exclude_echo_noise=True)
+        self.is_stopped = False
+        self.is_skipping_results = False #除外したコマンドの結果の行も除外する
+        self.open_record = "" #複数行にまたがるコマンドの途中部分
+        self.records = [] #アンドゥで取り消されていない記録行
+        self.command_starts = [] #recordsの中で各コマンド(と結果の行)が始まる位置のスタック
+        self.redo_stack = [] #アンドゥで取り消されたコマンドの行
+        self.pending_undo = None #undo;の後にMayaが出力する// Undo: ... //を待っている状態
+        self.emitted_count = 0 #リストに渡し済みの行数
+        self.lowest_changed = 0 #今回のpollで変更された最も前の位置
+
+    def read_records(self):
+        for line in self.tailer.read_new_lines():
+            mel_record = self.open_record + "\n" + line if self.open_record else line #文字列リテラル内の改行を保つ
+            if len(mel_record) < MAX_OPEN_RECORD_LENGTH and parse_mel_line(mel_record).is_open: #文字列や括弧が閉じていない場合は次の行と結合
+                self.open_record = mel_record
+                continue
+            self.open_record = ""
+            yield mel_record
+
+    def undo(self):
+        if not self.command_starts:
+            return #記録開始前のコマンドのアンドゥ
+        start = self.command_starts.pop()
+        self.redo_stack.append(self.records[start:])
+        del self.records[start:]
+        self.lowest_changed = min(self.lowest_changed, start)
+
+    def redo(self):
+        if not self.redo_stack:
+            return
+        self.command_starts.append(len(self.records))
+        self.records.extend(self.redo_stack.pop())
+
+    def apply_pending_undo(self):
+        if self.pending_undo == "undo":
+            self.undo()
+        elif self.pending_undo == "redo":
+            self.redo()
+        self.pending_undo = None
+
+    def add_record(self, mel_record):
+        undo_echo = UNDO_ECHO_PATTERN.match(mel_record)
+        if undo_echo:
+            self.pending_undo = None #undo;とその出力は一回のアンドゥとして扱う
+            if self.capture_filter.is_excluded(undo_echo.group(2)):
+                return #記録していないコマンドのアンドゥ
+            if undo_echo.group(1) == "Undo":
+                self.undo()
+            else:
+                self.redo()
+            return
+        self.apply_pending_undo()
+        undo_state = undo_command(mel_record)
+        if undo_state:
+            self.pending_undo = undo_state
+        elif parse_mel_line(mel_record).is_comment_only:
+            self.append_result(mel_record)
+        else:
+            self.push_command(mel_record)
+
+    def push_command(self, mel_record):
+        self.redo_stack = [] #新しいコマンドを実行するとリドゥはできなくなる
+        self.command_starts.append(len(self.records))
+        self.records.append(mel_record)
+
+    def append_result(self, mel_record):
+        if not self.records:
+            self.push_command(mel_record)
+            return
+        self.records.append(mel_record) #結果の行は直前のコマンドと一緒に取り消す
+
+    def filtered_records(self):
+        for mel_record in self.read_records(): #読み込みから記録までジェネレータで繋ぎ、履歴全体をメモリに載せない
+            rule_category = self.capture_filter.classify(mel_record)
+            if rule_category == STOP and self.stops_capture:
+                self.is_stopped = True #import文以降は無視(実行されたこのツールのスクリプトも記録されているため)
+                return
+            elif rule_category in (STOP, EXCLUDE):
+                self.is_skipping_results = True #selectなどの除外するコマンドは無視
+                continue
+            elif self.is_skipping_results and rule_category is None and parse_mel_line(mel_record).is_comment_only and not UNDO_ECHO_PATTERN.match(mel_record):
+                continue
+            self.is_skipping_results = False
+            yield mel_record
+
+    def resume(self):
+        #一時停止中に書き込まれた履歴は読まずに、再開後の部分だけを同じ記録に追加する
+        self.tailer.skip_to_end()
+        self.open_record = ""
+        self.is_stopped = False
+        self.is_skipping_results = False
+
+    def poll(self, is_final=False):
+        #戻り値は(リストの末尾から削除する行数, 末尾に追加する行)
+        self.lowest_changed = len(self.records)
+        if not self.is_stopped:
+            for mel_record in self.filtered_records():
+                self.add_record(mel_record)
+        if is_final:
+            self.apply_pending_undo()
+        self.lowest_changed = min(self.lowest_changed, self.emitted_count)
+        removed_count = self.emitted_count - self.lowest_changed
+        new_records = self.records[self.lowest_changed:]
+        self.emitted_count = len(self.records)
+        return removed_count, new_records
+
+
+class RecentCommandBuffer(CaptureSession):
+    #記録ボタンを押す前の操作も後から取り出せるように、直近のコマンドだけを常に保持する
+    stops_capture = False
+
+    def __init__(self, path, capture_filter=None, max_commands=DEFAULT_RECENT_COMMAND_COUNT):
+        super().__init__(path, capture_filter)
+        self.command_groups = deque(maxlen=max_commands) #コマンドと結果の行の組、古いものから自動で捨てられる
+        self.redo_stack = deque(maxlen=max_commands)
+
+    def set_max_commands(self, max_commands):
+        self.command_groups = deque(self.command_groups, maxlen=max_commands)
+        self.redo_stack = deque(self.redo_stack, maxlen=max_commands)
+
+    def push_command(self, mel_record):
+        self.redo_stack.clear()
+        self.command_groups.append([mel_record])
+
+    def append_result(self, mel_record):
+        if self.command_groups:
+            self.command_groups[-1].append(mel_record)
+
+    def undo(self):
+        if self.command_groups:
+            self.redo_stack.append(self.command_groups.pop())
+
+    def redo(self):
+        if self.redo_stack:
+            self.command_groups.append(self.redo_stack.pop())
+
+    def poll(self):
+        for mel_record in self.filtered_records():
+            self.add_record(mel_record)
+
+    def switch_file(self, path):
+        #履歴ファイルを切り替えたときは新しいファイルの先頭から読む
+        self.tailer = HistoryTailer(path)
+        self.open_record = ""
+
+    def recent_records(self, count):
+        command_groups = list(self.command_groups)[-count:] if count > 0 else []
+        return [mel_record for command_group in command_groups for mel_record in command_group]
@@ -0,0 +1,114 @@
+import ast
+import math
+
+INPUT_NAMES = {"i", "n", "x", "y", "z"} #オブジェクトの番号、オブジェクト数、ワールド位置
+POSITION_NAMES = ("x", "y", "z")
+CONSTANT_VALUES = {"pi": math.pi, "e": math.e, "tau": math.tau}
+MAX_POWER_EXPONENT = 64
+
+#式で使える関数名 -> (引数の数, Pythonでの関数, NumPyでの関数)
+EXPRESSION_FUNCTIONS = {
+    "sin": (1, "math.sin", "np.sin"),
+    "cos": (1, "math.cos", "np.cos"),
+    "tan": (1, "math.tan", "np.tan"),
+    "asin": (1, "math.asin", "np.arcsin"),
+    "acos": (1, "math.acos", "np.arccos"),
+    "atan": (1, "math.atan", "np.arctan"),
+    "atan2": (2, "math.atan2", "np.arctan2"),
+    "sqrt": (1, "math.sqrt", "np.sqrt"),
+    "exp": (1, "math.exp", "np.exp"),
+    "log": (1, "math.log", "np.log"),
+    "log10": (1, "math.log10", "np.log10"),
+    "floor": (1, "math.floor", "np.floor"),
+    "ceil": (1, "math.ceil", "np.ceil"),
+    "radians": (1, "math.radians", "np.radians"),
+    "degrees": (1, "math.degrees", "np.degrees"),
+    "hypot": (2, "math.hypot", "np.hypot"),
+    "abs": (1, "abs", "np.abs"),
+    "round": (1, "round", "np.round"),
+    "min": (2, "min", "np.minimum"),
+    "max": (2, "max", "np.maximum"),
+}
+BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+
+class IterationExpressionError(ValueError):
+    pass
+
+
+def constant_value(node):
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, UNARY_OPERATORS):
+        value = constant_value(node.operand)
+        return None if value is None else (-value if isinstance(node.op, ast.USub) else value)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return node.value
+    return None
+
+
+def check_expression_node(node):
+    #許可した構文だけで書かれているかを再帰的に確かめる(属性参照・添字・代入などはすべて拒否)
+    if isinstance(node, ast.Expression):
+        check_expression_node(node.body)
+    elif isinstance(node, ast.BinOp) and isinstance(node.op, BINARY_OPERATORS):
+        if isinstance(node.op, ast.Pow):
+            exponent = constant_value(node.right)
+            if exponent is None or abs(exponent) > MAX_POWER_EXPONENT: #巨大な整数の計算を防ぐ
+                raise IterationExpressionError(f"Exponent must be a number up to {MAX_POWER_EXPONENT}")
+        check_expression_node(node.left)
+        check_expression_node(node.right)
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, UNARY_OPERATORS):
+        check_expression_node(node.operand)
+    elif isinstance(node, ast.Constant):
+        if constant_value(node) is None:
+            raise IterationExpressionError(f"Only numbers are allowed: {node.value!r}")
+    elif isinstance(node, ast.Name):
+        if node.id not in INPUT_NAMES and node.id not in CONSTANT_VALUES:
+            raise IterationExpressionError(f"Unknown name: {node.id}")
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in EXPRESSION_FUNCTIONS:
+            raise IterationExpressionError(f"Unknown function: {ast.unparse(node.func)}")
+        argument_count = EXPRESSION_FUNCTIONS[node.func.id][0]
+        if node.keywords or len(node.args) != argument_count:
+            raise IterationExpressionError(f"{node.func.id}() takes {argument_count} argument(s)")
+        for argument in node.args:
+            check_expression_node(argument)
+    else:
+        raise IterationExpressionError(f"Not allowed in iteration expressions: {ast.unparse(node)}")
+
+
+class BackendTransformer(ast.NodeTransformer):
+    #関数名と定数をPython(math)またはNumPy(np)の呼び出しに置き換える
+    def __init__(self, function_index):
+        self.function_index = function_index
+
+    def visit_Name(self, node):
+        if node.id in CONSTANT_VALUES:
+            return ast.copy_location(ast.Constant(CONSTANT_VALUES[node.id]), node)
+        return node
+
+    def visit_Call(self, node):
+        node.args = [self.visit(argument) for argument in node.args]
+        node.func = ast.parse(EXPRESSION_FUNCTIONS[node.func.id][self.function_index], mode="eval").body
+        return node
+
+
+class IterationExpression:
+    def __init__(self, text):
+        self.text = text
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as error:
+            raise IterationExpressionError(f"Invalid expression: {error.msg}") from None
+        check_expression_node(tree)
+        self.input_names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id in INPUT_NAMES}
+        self.python_source = ast.unparse(BackendTransformer(1).visit(ast.parse(text.strip(), mode="eval")))
+        self.numpy_source = ast.unparse(BackendTransformer(2).visit(ast.parse(text.strip(), mode="eval")))
+
+    @property
+    def uses_position(self):
+        return not self.input_names.isdisjoint(POSITION_NAMES)
+
+    @property
+    def uses_math(self):
+        return "math." in self.python_source
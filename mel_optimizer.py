@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+from mel_parser import NUMBER, STRING, WORD, parse_mel_line
+from mel_transpiler import bind_statement_arguments
+
+SUMMABLE_COMMANDS = {"move", "rotate"}
+RELATIVE_FLAGS = {"r", "relative"}
+SINGLE_AXIS_FLAGS = {"x", "y", "z", "xyz"}
+SET_ATTR_STATE_FLAGS = {"keyable", "k", "lock", "l", "channelBox", "cb", "size", "s", "clamp", "c", "alteredValue", "av"}
+TOGGLE_PREFIXES = ("Toggle", "toggle")
+
+
+def single_statement(mel_command):
+    if "{" in mel_command: #変数が設定された行は最適化しない
+        return None
+    mel_line = parse_mel_line(mel_command)
+    if mel_line.comments or len(mel_line.statements) != 1:
+        return None
+    return mel_line.statements[0]
+
+
+def set_attr_plug(statement):
+    #同じプラグへの値の上書きだけを対象にし、ロックやキー設定などの状態変更は残す
+    if statement.command != "setAttr":
+        return None
+    bound_arguments = bind_statement_arguments(statement)
+    if bound_arguments is None:
+        return None
+    positional_tokens, flag_tokens = bound_arguments
+    if not positional_tokens or SET_ATTR_STATE_FLAGS.intersection(flag_tokens):
+        return None
+    plug_token = positional_tokens[0]
+    if plug_token.kind not in (STRING, WORD):
+        return None
+    return plug_token.value
+
+
+def relative_transform(statement):
+    #相対移動・回転の (コマンド名, フラグと対象の組み合わせ, 値) を返す
+    if statement.command not in SUMMABLE_COMMANDS:
+        return None
+    bound_arguments = bind_statement_arguments(statement)
+    if bound_arguments is None:
+        return None
+    positional_tokens, flag_tokens = bound_arguments
+    if not RELATIVE_FLAGS.intersection(flag_tokens) or SINGLE_AXIS_FLAGS.intersection(flag_tokens):
+        return None
+    values = positional_tokens[:3]
+    if len(values) != 3 or any(token.kind != NUMBER for token in values):
+        return None
+    flag_key = tuple(sorted((flag, tuple(tuple(arg.text for arg in args) for args in flag_args)) for flag, flag_args in flag_tokens.items()))
+    object_key = tuple(token.text for token in positional_tokens[3:])
+    return (statement.command, flag_key, object_key), [token.value for token in values], values
+
+
+def format_number(value):
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.10g}"
+
+
+def sum_relative_transforms(statement, value_tokens, values):
+    mel_command = statement.command
+    for token in statement.arguments:
+        mel_command += " " + (format_number(values[value_tokens.index(token)]) if token in value_tokens else token.text)
+    return mel_command + ";"
+
+
+def can_sum(command_name, values, next_values):
+    if command_name == "move":
+        return True
+    #回転は同じ一軸のみの場合だけ順序に依存しないので合算できる
+    axes = {axis for axis in range(3) if values[axis] != 0 or next_values[axis] != 0}
+    return len(axes) <= 1
+
+
+@lru_cache(maxsize=8192)
+def analyze_mel_command(mel_command):
+    #記録には同じ行が繰り返し現れるので、行ごとの解析結果をキャッシュする
+    statement = single_statement(mel_command)
+    if statement is None:
+        return None
+    return statement, set_attr_plug(statement), relative_transform(statement)
+
+
+def optimize_mel_records(mel_records):
+    optimized_records = []
+    analyses = [] #optimized_recordsと対応する解析結果
+    removed_count = 0
+    for mel_command in mel_records:
+        analysis = analyze_mel_command(mel_command)
+        previous = analyses[-1] if analyses else None
+        if analysis is not None and previous is not None:
+            statement, plug, transform = analysis
+            previous_statement, previous_plug, previous_transform = previous
+            #同じプラグへの連続したsetAttrは最後の値だけを残す
+            if plug is not None and previous_plug == plug:
+                optimized_records[-1] = mel_command
+                analyses[-1] = analysis
+                removed_count += 1
+                continue
+            #同じフラグ・同じ対象への連続した相対移動・回転は合算する
+            if transform is not None and previous_transform is not None and transform[0] == previous_transform[0] and can_sum(transform[0][0], previous_transform[1], transform[1]):
+                values = [a + b for a, b in zip(previous_transform[1], transform[1])]
+                optimized_records[-1] = sum_relative_transforms(previous_statement, previous_transform[2], values)
+                analyses[-1] = analyze_mel_command(optimized_records[-1])
+                removed_count += 1
+                continue
+            #同じトグルコマンドが連続した場合は打ち消し合う
+            if statement.command and statement.command.startswith(TOGGLE_PREFIXES) and not statement.arguments and previous_statement.command == statement.command and not previous_statement.arguments:
+                optimized_records.pop()
+                analyses.pop()
+                removed_count += 2
+                continue
+        optimized_records.append(mel_command)
+        analyses.append(analysis)
+    return optimized_records, removed_count
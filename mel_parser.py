@@ -0,0 +1,187 @@
+import re
+from functools import lru_cache
+
+WORD = "word"
+FLAG = "flag"
+NUMBER = "number"
+STRING = "string"
+SEMICOLON = "semicolon"
+COMMENT = "comment"
+
+NUMBER_PATTERN = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+FLAG_PATTERN = re.compile(r"-[A-Za-z_]\w*")
+OPEN_BRACKETS = "([{"
+CLOSE_BRACKETS = ")]}"
+
+
+class MelToken:
+    __slots__ = ("kind", "text", "start", "end")
+
+    def __init__(self, kind, text, start, end):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+
+    @property
+    def value(self):
+        if self.kind == STRING:
+            return unescape_mel_string(self.text[1:-1] if self.text.endswith("\"") and len(self.text) > 1 else self.text[1:])
+        if self.kind == NUMBER:
+            return float(self.text) if re.search(r"[.eE]", self.text) else int(self.text)
+        if self.kind == COMMENT:
+            return self.text[2:].strip()
+        return self.text
+
+    def __repr__(self):
+        return f"MelToken({self.kind}, {self.text!r})"
+
+
+class MelStatement:
+    __slots__ = ("tokens", "command")
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.command = None
+        if tokens and tokens[0].kind == WORD and not tokens[0].text.startswith("$"):
+            self.command = tokens[0].text
+
+    @property
+    def arguments(self):
+        return self.tokens[1:] if self.command else self.tokens
+
+    def flag_groups(self):
+        #フラグの引数の個数はコマンドごとに異なるため、数値と文字列リテラルのみを直前のフラグの引数とみなす
+        groups = []
+        positional = []
+        current_group = None
+        for token in self.arguments:
+            if token.kind == FLAG:
+                current_group = (token.text, [])
+                groups.append(current_group)
+            elif current_group is not None and token.kind in (NUMBER, STRING):
+                current_group[1].append(token)
+            else:
+                current_group = None
+                positional.append(token)
+        return groups, positional
+
+    @property
+    def flags(self):
+        return self.flag_groups()[0]
+
+    @property
+    def positional_args(self):
+        return self.flag_groups()[1]
+
+
+class MelLine:
+    __slots__ = ("text", "tokens", "statements", "comments", "is_open")
+
+    def __init__(self, text):
+        self.text = text
+        all_tokens, self.is_open = tokenize_mel(text)
+        self.tokens = [] #ドロップダウンなどで使う、区切りとコメントを除いたトークン
+        self.comments = []
+        self.statements = []
+        statement_tokens = []
+        for token in all_tokens:
+            if token.kind == COMMENT:
+                self.comments.append(token)
+            elif token.kind == SEMICOLON:
+                if statement_tokens:
+                    self.statements.append(MelStatement(statement_tokens))
+                statement_tokens = []
+            else:
+                self.tokens.append(token)
+                statement_tokens.append(token)
+        if statement_tokens:
+            self.statements.append(MelStatement(statement_tokens))
+
+    @property
+    def words(self):
+        return [token.text for token in self.tokens]
+
+    @property
+    def is_comment_only(self):
+        return not self.tokens and bool(self.comments)
+
+
+def unescape_mel_string(text):
+    return re.sub(r"\\(.)", lambda match: {"n": "\n", "t": "\t", "r": "\r"}.get(match.group(1), match.group(1)), text)
+
+
+def tokenize_mel(text):
+    tokens = []
+    is_open = False
+    length = len(text)
+    i = 0
+    while i < length: #一回の走査でトークン化
+        char = text[i]
+        if char.isspace():
+            i += 1
+        elif char == ";":
+            tokens.append(MelToken(SEMICOLON, char, i, i + 1))
+            i += 1
+        elif text.startswith("//", i):
+            comment_end = text.find("\n", i) #複数行の記録では行末までがコメント
+            if comment_end == -1:
+                comment_end = length
+            tokens.append(MelToken(COMMENT, text[i:comment_end], i, comment_end))
+            i = comment_end
+        elif text.startswith("/*", i):
+            comment_end = text.find("*/", i + 2)
+            if comment_end == -1:
+                is_open = True
+                comment_end = length
+            else:
+                comment_end += 2
+            tokens.append(MelToken(COMMENT, text[i:comment_end], i, comment_end))
+            i = comment_end
+        elif char == "\"":
+            start = i
+            i += 1
+            while i < length and text[i] != "\"":
+                i += 2 if text[i] == "\\" else 1
+            if i >= length:
+                is_open = True #閉じられていない文字列は次の行に続く
+                i = length
+            else:
+                i += 1
+            tokens.append(MelToken(STRING, text[start:i], start, i))
+        else:
+            start = i
+            depth = 0
+            in_backtick = False
+            while i < length:
+                char = text[i]
+                if char == "`":
+                    in_backtick = not in_backtick
+                elif char in OPEN_BRACKETS:
+                    depth += 1
+                elif char in CLOSE_BRACKETS and depth > 0:
+                    depth -= 1
+                elif depth == 0 and not in_backtick and (char.isspace() or char == ";"):
+                    break
+                i += 1
+            if depth > 0 or in_backtick:
+                is_open = True
+            word = text[start:i]
+            if NUMBER_PATTERN.fullmatch(word):
+                kind = NUMBER
+            elif FLAG_PATTERN.fullmatch(word):
+                kind = FLAG
+            else:
+                kind = WORD
+            tokens.append(MelToken(kind, word, start, i))
+    return tokens, is_open
+
+
+@lru_cache(maxsize=8192)
+def parse_mel_line(text):
+    return MelLine(text)
+
+
+def replace_mel_token(text, token_index, replacement):
+    token = parse_mel_line(text).tokens[token_index]
+    return text[:token.start] + replacement + text[token.end:] #元の空白や引用符を保ったまま置換
@@ -0,0 +1,467 @@
+import keyword
+import re
+
+from mel_parser import FLAG, NUMBER, STRING, WORD, parse_mel_line
+
+#{名前}は変数・対象オブジェクト・生成ノードの参照、{{ }}は文字どおりの波括弧(escape_literal_bracesで変換済みのMEL)
+PLACEHOLDER_PATTERN = re.compile(r"(?<!\{)\{([A-Za-z_]\w*(?:\[\d+\])?)\}(?!\})")
+OBJECT_PLACEHOLDER_PATTERN = re.compile(r"\{(?:obj|new_node_\d+\[\d+\])\}")
+BOOLEAN_WORDS = {"true": "True", "on": "True", "yes": "True", "false": "False", "off": "False", "no": "False"}
+
+#コマンドごとのフラグと引数の個数(0はブール値フラグ)。短縮名と正式名の両方を登録し、Python側でもMELと同じ名前で渡す
+COMMAND_SIGNATURES = {
+    "polyExtrudeFacet": {
+        "ch": 1, "constructionHistory": 1, "kft": 1, "keepFacesTogether": 1,
+        "pvx": 1, "pvy": 1, "pvz": 1, "pivotX": 1, "pivotY": 1, "pivotZ": 1, "pv": 3, "pivot": 3,
+        "d": 1, "divisions": 1, "twt": 1, "twist": 1, "tp": 1, "taper": 1, "off": 1, "offset": 1,
+        "tk": 1, "thickness": 1, "sma": 1, "smoothingAngle": 1,
+        "t": 3, "translate": 3, "tx": 1, "ty": 1, "tz": 1, "translateX": 1, "translateY": 1, "translateZ": 1,
+        "ro": 3, "rotate": 3, "rx": 1, "ry": 1, "rz": 1, "rotateX": 1, "rotateY": 1, "rotateZ": 1,
+        "s": 3, "scale": 3, "sx": 1, "sy": 1, "sz": 1, "scaleX": 1, "scaleY": 1, "scaleZ": 1,
+        "lt": 3, "localTranslate": 3, "ltx": 1, "lty": 1, "ltz": 1, "localTranslateX": 1, "localTranslateY": 1, "localTranslateZ": 1,
+        "lr": 3, "localRotate": 3, "ls": 3, "localScale": 3, "lc": 1, "localCenter": 1, "ld": 3, "localDirection": 3,
+        "ws": 1, "worldSpace": 1, "n": 1, "name": 1,
+    },
+    "polyBevel3": {
+        "ch": 1, "constructionHistory": 1, "fraction": 1, "offsetAsFraction": 1, "autoFit": 1, "depth": 1,
+        "mitering": 1, "miterAlong": 1, "chamfer": 1, "segments": 1, "worldSpace": 1, "smoothingAngle": 1,
+        "subdivideNgons": 1, "mergeVertices": 1, "mergeVertexTolerance": 1, "miteringAngle": 1, "angleTolerance": 1,
+        "offset": 1, "forceParallel": 1, "n": 1, "name": 1,
+    },
+    "setAttr": {
+        "type": 1, "typ": 1, "keyable": 1, "k": 1, "lock": 1, "l": 1, "channelBox": 1, "cb": 1,
+        "size": 1, "s": 1, "clamp": 0, "c": 0, "alteredValue": 0, "av": 0,
+    },
+    "move": {
+        "r": 0, "relative": 0, "a": 0, "absolute": 0, "ws": 0, "worldSpace": 0, "os": 0, "objectSpace": 0,
+        "ls": 0, "localSpace": 0, "wd": 0, "worldSpaceDistance": 0, "cs": 0, "componentSpace": 0,
+        "rpr": 0, "rotatePivotRelative": 0, "spr": 0, "scalePivotRelative": 0,
+        "pcp": 0, "preserveChildPosition": 0, "pgp": 0, "preserveGeometryPosition": 0,
+        "x": 0, "y": 0, "z": 0, "xyz": 0,
+    },
+    "rotate": {
+        "r": 0, "relative": 0, "a": 0, "absolute": 0, "ws": 0, "worldSpace": 0, "os": 0, "objectSpace": 0,
+        "p": 3, "pivot": 3, "cp": 0, "centerPivot": 0, "ocp": 0, "objectCenterPivot": 0,
+        "eu": 0, "euler": 0, "fo": 0, "forceOrderXYZ": 0, "cs": 0, "componentSpace": 0,
+        "pcp": 0, "preserveChildPosition": 0, "pgp": 0, "preserveGeometryPosition": 0,
+        "x": 0, "y": 0, "z": 0, "xyz": 0,
+    },
+    "scale": {
+        "r": 0, "relative": 0, "a": 0, "absolute": 0, "ws": 0, "worldSpace": 0, "os": 0, "objectSpace": 0,
+        "p": 3, "pivot": 3, "cp": 0, "centerPivot": 0, "ocp": 0, "objectCenterPivot": 0, "cs": 0, "componentSpace": 0,
+        "pcp": 0, "preserveChildPosition": 0, "pgp": 0, "preserveGeometryPosition": 0,
+        "x": 0, "y": 0, "z": 0, "xyz": 0,
+    },
+    "xform": {
+        "a": 0, "absolute": 0, "r": 0, "relative": 0, "ws": 0, "worldSpace": 0, "os": 0, "objectSpace": 0,
+        "t": 3, "translation": 3, "ro": 3, "rotation": 3, "s": 3, "scale": 3, "sh": 3, "shear": 3,
+        "rp": 3, "rotatePivot": 3, "sp": 3, "scalePivot": 3, "piv": 3, "pivots": 3, "ra": 3, "rotateAxis": 3,
+        "roo": 1, "rotateOrder": 1, "m": 16, "matrix": 16, "cp": 0, "centerPivots": 0,
+        "ztp": 0, "zeroTransformPivots": 0, "p": 1, "preserve": 1, "wd": 0, "worldSpaceDistance": 0, "eu": 0, "euler": 0,
+    },
+    "polySmooth": {
+        "mth": 1, "method": 1, "sdt": 1, "subdivisionType": 1, "ovb": 1, "osdVertBoundary": 1,
+        "ofb": 1, "osdFvarBoundary": 1, "ofc": 1, "osdFvarPropagateCorners": 1, "ost": 1, "osdSmoothTriangles": 1,
+        "ocr": 1, "osdCreaseMethod": 1, "dv": 1, "divisions": 1, "bnr": 1, "boundaryRule": 1, "c": 1, "continuity": 1,
+        "kb": 1, "keepBorder": 1, "ksb": 1, "keepSelectionBorder": 1, "khe": 1, "keepHardEdge": 1,
+        "kt": 1, "keepTessellation": 1, "kmb": 1, "keepMapBorders": 1, "suv": 1, "smoothUVs": 1,
+        "peh": 1, "propagateEdgeHardness": 1, "sl": 1, "subdivisionLevels": 1, "dpe": 1, "divisionsPerEdge": 1,
+        "ps": 1, "pushStrength": 1, "ro": 1, "roundness": 1, "ch": 1, "constructionHistory": 1,
+    },
+    "delete": {
+        "ch": 0, "constructionHistory": 0, "all": 0, "c": 0, "channels": 0, "hi": 1, "hierarchy": 1,
+        "e": 0, "expressions": 0, "icn": 0, "inputConnectionsAndNodes": 0, "s": 0, "shape": 0,
+        "sc": 0, "staticChannels": 0, "cp": 0, "controlPoints": 0,
+    },
+    "makeIdentity": {
+        "a": 1, "apply": 1, "t": 1, "translate": 1, "r": 1, "rotate": 1, "s": 1, "scale": 1,
+        "n": 1, "normal": 1, "pn": 1, "preserveNormals": 1, "jo": 0, "jointOrient": 0,
+    },
+    "polySoftEdge": {"a": 1, "angle": 1, "ch": 1, "constructionHistory": 1, "n": 1, "name": 1},
+    "polyMergeVertex": {"d": 1, "distance": 1, "am": 1, "alwaysMergeTwoVertices": 1, "ch": 1, "constructionHistory": 1},
+    "polyTriangulate": {"ch": 1, "constructionHistory": 1},
+    "polyQuad": {
+        "a": 1, "angle": 1, "kgb": 1, "keepGroupBorder": 1, "ktb": 1, "keepTextureBorders": 1,
+        "khe": 1, "keepHardEdges": 1, "ws": 1, "worldSpace": 1, "ch": 1, "constructionHistory": 1,
+    },
+    "polyNormal": {"nm": 1, "normalMode": 1, "unm": 1, "userNormalMode": 1, "ch": 1, "constructionHistory": 1},
+    "polyCube": {
+        "w": 1, "width": 1, "h": 1, "height": 1, "d": 1, "depth": 1,
+        "sx": 1, "subdivisionsX": 1, "sy": 1, "subdivisionsY": 1, "sz": 1, "subdivisionsZ": 1,
+        "ax": 3, "axis": 3, "cuv": 1, "createUVs": 1, "ch": 1, "constructionHistory": 1, "n": 1, "name": 1,
+    },
+    "polySphere": {
+        "r": 1, "radius": 1, "sx": 1, "subdivisionsX": 1, "sy": 1, "subdivisionsY": 1,
+        "ax": 3, "axis": 3, "cuv": 1, "createUVs": 1, "ch": 1, "constructionHistory": 1, "n": 1, "name": 1,
+    },
+    "polyCylinder": {
+        "r": 1, "radius": 1, "h": 1, "height": 1, "sx": 1, "subdivisionsX": 1, "sy": 1, "subdivisionsY": 1,
+        "sz": 1, "subdivisionsZ": 1, "ax": 3, "axis": 3, "rcp": 1, "roundCap": 1,
+        "cuv": 1, "createUVs": 1, "ch": 1, "constructionHistory": 1, "n": 1, "name": 1,
+    },
+    "polyPlane": {
+        "w": 1, "width": 1, "h": 1, "height": 1, "sx": 1, "subdivisionsX": 1, "sy": 1, "subdivisionsY": 1,
+        "ax": 3, "axis": 3, "cuv": 1, "createUVs": 1, "ch": 1, "constructionHistory": 1, "n": 1, "name": 1,
+    },
+    "duplicate": {"rr": 0, "returnRootsOnly": 0, "n": 1, "name": 1, "un": 0, "upstreamNodes": 0, "ic": 0, "inputConnections": 0, "rc": 0, "renameChildren": 0},
+    "group": {"n": 1, "name": 1, "w": 0, "world": 0, "em": 0, "empty": 0, "p": 1, "parent": 1, "a": 0, "absolute": 0, "r": 0, "relative": 0},
+    "parent": {"w": 0, "world": 0, "r": 0, "relative": 0, "a": 0, "absolute": 0, "s": 0, "shape": 0, "add": 0},
+    "hide": {},
+    "showHidden": {},
+    "createNode": {"n": 1, "name": 1, "p": 1, "parent": 1, "ss": 0, "skipSelect": 0, "s": 0, "shared": 0},
+}
+
+#オブジェクトを引数に取り、省略すると選択中のオブジェクトに対して実行されるコマンド
+OBJECT_ARGUMENT_COMMANDS = {
+    "polyExtrudeFacet", "polyBevel3", "move", "rotate", "scale", "xform", "polySmooth", "delete",
+    "makeIdentity", "polySoftEdge", "polyMergeVertex", "polyTriangulate", "polyQuad", "polyNormal",
+    "duplicate", "group", "hide", "showHidden", "parent",
+}
+#指定すると選択中のオブジェクトを使わなくなるフラグ
+NO_TARGET_FLAGS = {"group": {"em", "empty"}}
+#最後の引数が操作対象ではなく親になるコマンドと、親を取らなくなるフラグ
+PARENT_ARGUMENT_COMMANDS = {"parent": {"w", "world"}}
+#選択中の全オブジェクトをまとめて一回の呼び出しで処理できるコマンド
+BATCHABLE_COMMANDS = {
+    "polySmooth", "delete", "makeIdentity", "polySoftEdge", "polyTriangulate", "polyQuad", "polyNormal",
+    "polyMergeVertex", "hide", "showHidden",
+}
+#実行後に選択が新しいノードに切り替わるコマンド
+SELECTION_CHANGING_COMMANDS = {"polyCube", "polySphere", "polyCylinder", "polyPlane", "duplicate", "group", "select", "createNode"}
+#結果行に生成したノード名を出力するコマンド(polyで始まるコマンドも含む)
+NODE_CREATING_COMMANDS = {
+    "polyCube", "polySphere", "polyCylinder", "polyPlane", "polyCone", "polyTorus", "duplicate", "instance",
+    "group", "createNode", "shadingNode", "spaceLocator", "joint", "circle", "curve", "nurbsPlane", "sphere",
+}
+QUERY_FLAGS = {"-q", "-query"}
+NODE_NAME_PATTERN = re.compile(r"[A-Za-z_|:][\w|:]*")
+#生成したノード名をリストではなく文字列一つで返すコマンド
+SINGLE_NODE_RESULT_COMMANDS = {"createNode", "group"}
+#MDGModifierでまとめて書き込める数値型のsetAttr -type
+NUMERIC_SET_ATTR_TYPES = {"double2", "double3", "float2", "float3", "long2", "long3", "short2", "short3"}
+#OpenMayaの関数セットで同じ結果になるとわかっているフラグの組み合わせ -> (チャンネル, 相対かどうか, 空間)
+TRANSFORM_FLAG_NAMES = {
+    "relative": "r", "absolute": "a", "worldSpace": "ws", "localSpace": "ls", "objectSpace": "os", "euler": "eu",
+    "translation": "t", "rotation": "ro", "scale": "s",
+}
+TRANSFORM_FAST_PATHS = {
+    ("move", frozenset({"r"})): ("translate", True, "kWorld"),
+    ("move", frozenset({"r", "ws"})): ("translate", True, "kWorld"),
+    ("move", frozenset({"r", "ls"})): ("translate", True, "kTransform"),
+    ("rotate", frozenset({"r", "eu"})): ("rotate", True, "kTransform"),
+    ("rotate", frozenset({"r", "os", "eu"})): ("rotate", True, "kTransform"),
+    ("rotate", frozenset({"a", "os"})): ("rotate", False, "kTransform"),
+    ("scale", frozenset()): ("scale", False, "kTransform"),
+    ("scale", frozenset({"a"})): ("scale", False, "kTransform"),
+    ("scale", frozenset({"r"})): ("scale", True, "kTransform"),
+    ("xform", frozenset({"t"})): ("translate", False, "kTransform"),
+    ("xform", frozenset({"t", "a"})): ("translate", False, "kTransform"),
+    ("xform", frozenset({"t", "os"})): ("translate", False, "kTransform"),
+    ("xform", frozenset({"t", "a", "os"})): ("translate", False, "kTransform"),
+    ("xform", frozenset({"t", "ws"})): ("translate", False, "kWorld"),
+    ("xform", frozenset({"t", "a", "ws"})): ("translate", False, "kWorld"),
+    ("xform", frozenset({"t", "r"})): ("translate", True, "kTransform"),
+    ("xform", frozenset({"t", "r", "os"})): ("translate", True, "kTransform"),
+    ("xform", frozenset({"t", "r", "ws"})): ("translate", True, "kWorld"),
+    ("xform", frozenset({"ro"})): ("rotate", False, "kTransform"),
+    ("xform", frozenset({"ro", "a"})): ("rotate", False, "kTransform"),
+    ("xform", frozenset({"ro", "os"})): ("rotate", False, "kTransform"),
+    ("xform", frozenset({"ro", "a", "os"})): ("rotate", False, "kTransform"),
+    ("xform", frozenset({"s"})): ("scale", False, "kTransform"),
+    ("xform", frozenset({"s", "a"})): ("scale", False, "kTransform"),
+    ("xform", frozenset({"s", "os"})): ("scale", False, "kTransform"),
+    ("xform", frozenset({"s", "r"})): ("scale", True, "kTransform"),
+    ("xform", frozenset({"s", "r", "os"})): ("scale", True, "kTransform"),
+}
+XFORM_VALUE_FLAGS = {"t", "ro", "s"}
+
+
+def double_braces(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def escape_literal_braces(mel_command, variable_names=()):
+    #宣言された変数・対象オブジェクト・生成ノードの{名前}だけを残し、それ以外の波括弧は{{ }}にして文字どおりに扱う
+    pieces = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(mel_command):
+        if match.group(1).split("[")[0] in variable_names or OBJECT_PLACEHOLDER_PATTERN.fullmatch(match.group(0)):
+            pieces.append(double_braces(mel_command[position:match.start()]) + match.group(0))
+            position = match.end()
+    pieces.append(double_braces(mel_command[position:]))
+    return "".join(pieces)
+
+
+def python_string_literal(text, is_format=False):
+    if not is_format:
+        text = text.replace("{{", "{").replace("}}", "}") #f文字列でなければ波括弧のエスケープを戻す
+    escaped = text.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return ("f\"" if is_format else "\"") + escaped + "\""
+
+
+def mel_eval_python(mel_command):
+    #変換できないコマンドはmel.evalで実行(変数や生成ノードを含む場合だけf文字列にする)
+    return f"mel.eval({python_string_literal(mel_command, is_format=bool(PLACEHOLDER_PATTERN.search(mel_command)))})"
+
+
+def token_to_python(token, is_value=False):
+    if token.kind == NUMBER:
+        return str(token.value)
+    if token.kind == STRING:
+        text = token.value
+    else:
+        text = token.text
+    placeholder = PLACEHOLDER_PATTERN.fullmatch(text)
+    if placeholder:
+        return placeholder.group(1) #変数やノード名だけの引数はPythonの式としてそのまま渡す
+    if PLACEHOLDER_PATTERN.search(text):
+        if token.kind == STRING:
+            text = token.text[1:-1] #f文字列にするため、MEL側のエスケープを保ったまま使用
+            return "f\"" + text.replace("\n", "\\n") + "\""
+        return python_string_literal(text, is_format=True)
+    if is_value and token.kind != STRING and text.lower() in BOOLEAN_WORDS:
+        return BOOLEAN_WORDS[text.lower()]
+    return python_string_literal(text)
+
+
+def vector_variable(flag_args):
+    #-t {v[0]} {v[1]} {v[2]} のように一つのベクトル変数の全要素が順に並んでいる場合はその変数名を返す
+    names = []
+    for index, token in enumerate(flag_args):
+        placeholder = PLACEHOLDER_PATTERN.fullmatch(token.text) if token.kind == WORD else None
+        if placeholder is None or OBJECT_PLACEHOLDER_PATTERN.fullmatch(token.text) or not placeholder.group(1).endswith(f"[{index}]"):
+            return None
+        names.append(placeholder.group(1)[:-len(f"[{index}]")])
+    if len(set(names)) != 1 or names[0] == "obj":
+        return None
+    return names[0]
+
+
+def is_object_token(token):
+    if token.kind == NUMBER:
+        return False
+    text = token.value if token.kind == STRING else token.text
+    if PLACEHOLDER_PATTERN.fullmatch(text):
+        return bool(OBJECT_PLACEHOLDER_PATTERN.fullmatch(text)) #数値の変数は値として扱う
+    return True
+
+
+def bind_statement_arguments(statement):
+    signature = COMMAND_SIGNATURES.get(statement.command)
+    if signature is None:
+        return None
+    arguments = statement.arguments
+    positional_tokens = []
+    flag_tokens = {}
+    i = 0
+    while i < len(arguments):
+        token = arguments[i]
+        if token.kind != STRING and (token.text.startswith(("-{", "-$", "$", "(")) or "`" in token.text or "{" in PLACEHOLDER_PATTERN.sub("", token.text)):
+            return None #フラグ名そのものが変数になっている場合やMELの式はmel.evalに任せる
+        if token.kind == FLAG:
+            flag = token.text[1:]
+            if flag not in signature or keyword.iskeyword(flag):
+                return None
+            arity = signature[flag]
+            flag_args = arguments[i + 1:i + 1 + arity]
+            if len(flag_args) < arity or any(arg.kind == FLAG for arg in flag_args):
+                return None
+            flag_tokens.setdefault(flag, []).append(flag_args)
+            i += 1 + arity
+        else:
+            positional_tokens.append(token)
+            i += 1
+    return positional_tokens, flag_tokens
+
+
+def statement_object_tokens(statement):
+    bound_arguments = bind_statement_arguments(statement)
+    positional_tokens = bound_arguments[0] if bound_arguments else statement.positional_args
+    return [token for token in positional_tokens if is_object_token(token)]
+
+
+def target_is_omitted(statement, object_tokens):
+    #対象オブジェクトの引数が省略され、選択中のオブジェクトが使われるかどうか
+    flag_names = {flag[1:] for flag, flag_args in statement.flags}
+    if not flag_names.isdisjoint(NO_TARGET_FLAGS.get(statement.command, ())):
+        return False
+    if statement.command in PARENT_ARGUMENT_COMMANDS and flag_names.isdisjoint(PARENT_ARGUMENT_COMMANDS[statement.command]):
+        return len(object_tokens) < 2 #一つだけの場合は親の指定
+    return not object_tokens
+
+
+def statement_depends_on_selection(statement):
+    if statement.command in COMMAND_SIGNATURES and statement.command not in OBJECT_ARGUMENT_COMMANDS:
+        return False
+    return target_is_omitted(statement, statement_object_tokens(statement))
+
+
+def mel_command_depends_on_selection(mel_command):
+    return any(statement_depends_on_selection(statement) for statement in parse_mel_line(mel_command).statements)
+
+
+def mel_command_changes_selection(mel_command):
+    return any(statement.command in SELECTION_CHANGING_COMMANDS for statement in parse_mel_line(mel_command).statements)
+
+
+def mel_command_creates_nodes(mel_command):
+    #問い合わせ(-q)の結果行は数値や設定値なのでノードの生成とはみなさない
+    statements = parse_mel_line(mel_command).statements
+    if not statements or statements[-1].command is None:
+        return False
+    statement = statements[-1]
+    if any(flag in QUERY_FLAGS for flag, flag_args in statement.flags):
+        return False
+    return statement.command in NODE_CREATING_COMMANDS or statement.command.startswith("poly")
+
+
+def is_node_name(text):
+    return bool(NODE_NAME_PATTERN.fullmatch(text)) and text.lower() not in BOOLEAN_WORDS
+
+
+def transpile_statement(statement, target=None, batch_target=None):
+    bound_arguments = bind_statement_arguments(statement)
+    if bound_arguments is None:
+        return None
+    positional_tokens, flag_tokens = bound_arguments
+    python_args = []
+    #setAttrの値のon/offなどはブール値として渡す(-typeで文字列などを指定した場合は除く)
+    has_set_attr_values = statement.command == "setAttr" and not {"type", "typ"}.intersection(flag_tokens)
+    for token_index, token in enumerate(positional_tokens):
+        python_arg = token_to_python(token, is_value=has_set_attr_values and token_index > 0)
+        if batch_target is not None and is_object_token(token):
+            if python_arg == "obj":
+                python_arg = batch_target
+            else:
+                python_arg = f"[{python_arg.replace('{obj}', '{o}')} for o in {batch_target}]" #コンポーネント指定はオブジェクトごとに展開
+        python_args.append(python_arg)
+    if target is not None and statement.command in OBJECT_ARGUMENT_COMMANDS and target_is_omitted(statement, [token for token in positional_tokens if is_object_token(token)]):
+        if statement.command in PARENT_ARGUMENT_COMMANDS:
+            python_args.insert(0, batch_target or target) #親は最後の引数のまま
+        else:
+            python_args.append(batch_target or target) #選択に頼らず対象オブジェクトを明示的に渡す
+    for flag, flag_args_list in flag_tokens.items():
+        values = []
+        for flag_args in flag_args_list:
+            if not flag_args:
+                values.append("True")
+            elif len(flag_args) == 1:
+                values.append(token_to_python(flag_args[0], is_value=True))
+            elif vector_variable(flag_args) is not None:
+                values.append(vector_variable(flag_args)) #ベクトル変数はそのまま渡す
+            else:
+                values.append("(" + ", ".join(token_to_python(arg, is_value=True) for arg in flag_args) + ")")
+        if len(values) == 1:
+            python_args.append(f"{flag}={values[0]}")
+        else:
+            python_args.append(f"{flag}=[{', '.join(values)}]") #複数回指定されたフラグはリストで渡す
+    return f"cmds.{statement.command}({', '.join(python_args)})"
+
+
+def mel_command_returns_single_node(mel_command):
+    statements = parse_mel_line(mel_command).statements
+    return bool(statements) and statements[-1].command in SINGLE_NODE_RESULT_COMMANDS
+
+
+def set_attr_values(mel_command):
+    #数値だけを書き込むsetAttrの(プラグ, [値])をPythonの式で返す
+    mel_line = parse_mel_line(mel_command)
+    if mel_line.is_open or len(mel_line.statements) != 1 or mel_line.statements[0].command != "setAttr":
+        return None
+    bound_arguments = bind_statement_arguments(mel_line.statements[0])
+    if bound_arguments is None:
+        return None
+    positional_tokens, flag_tokens = bound_arguments
+    for flag, flag_args_list in flag_tokens.items():
+        if flag not in ("type", "typ") or any(flag_args[0].value not in NUMERIC_SET_ATTR_TYPES for flag_args in flag_args_list):
+            return None
+    if len(positional_tokens) < 2 or positional_tokens[0].kind == NUMBER:
+        return None
+    for token in positional_tokens[1:]:
+        is_value_variable = token.kind == WORD and PLACEHOLDER_PATTERN.fullmatch(token.text) and not OBJECT_PLACEHOLDER_PATTERN.fullmatch(token.text)
+        if token.kind != NUMBER and not is_value_variable:
+            return None
+    return token_to_python(positional_tokens[0]), [token_to_python(token) for token in positional_tokens[1:]]
+
+
+def is_value_token(token):
+    if token.kind == NUMBER:
+        return True
+    return token.kind == WORD and bool(PLACEHOLDER_PATTERN.fullmatch(token.text)) and not OBJECT_PLACEHOLDER_PATTERN.fullmatch(token.text)
+
+
+def transpile_transform_fast_path(mel_command, target=None):
+    #移動・回転・スケールをOpenMayaで直接適用する式を返す(結果が変わる可能性のある組み合わせはNone)
+    mel_line = parse_mel_line(mel_command)
+    if mel_line.is_open or len(mel_line.statements) != 1:
+        return None
+    statement = mel_line.statements[0]
+    if statement.command not in ("move", "rotate", "scale", "xform"):
+        return None
+    bound_arguments = bind_statement_arguments(statement)
+    if bound_arguments is None:
+        return None
+    positional_tokens, flag_tokens = bound_arguments
+    flags = set()
+    for flag, flag_args_list in flag_tokens.items():
+        flag = TRANSFORM_FLAG_NAMES.get(flag, flag)
+        if flag in flags or len(flag_args_list) != 1:
+            return None
+        flags.add(flag)
+    fast_path = TRANSFORM_FAST_PATHS.get((statement.command, frozenset(flags)))
+    if fast_path is None:
+        return None
+    if statement.command == "xform":
+        value_flag = [flag for flag in flag_tokens if TRANSFORM_FLAG_NAMES.get(flag, flag) in XFORM_VALUE_FLAGS][0]
+        value_tokens = flag_tokens[value_flag][0]
+        object_tokens = positional_tokens
+    else:
+        value_tokens = positional_tokens[:3]
+        object_tokens = positional_tokens[3:]
+    if len(value_tokens) != 3 or not all(is_value_token(token) for token in value_tokens):
+        return None
+    if len(object_tokens) > 1 or not all(is_object_token(token) for token in object_tokens):
+        return None
+    if object_tokens:
+        node = token_to_python(object_tokens[0])
+        if re.search(r"[.\[]", PLACEHOLDER_PATTERN.sub("", object_tokens[0].text)):
+            return None #コンポーネントはcmdsで処理
+    elif target is not None:
+        node = target
+    else:
+        return None
+    channel, is_relative, space = fast_path
+    values = ", ".join(token_to_python(token) for token in value_tokens)
+    return f"apply_transform({node}, \"{channel}\", ({values}), {is_relative}, \"{space}\")" #OpenMayaがない環境でも引数の評価で失敗しないよう空間は名前で渡す
+
+
+def transpile_mel_command(mel_command, target=None):
+    mel_line = parse_mel_line(mel_command)
+    if mel_line.is_open or not mel_line.statements:
+        return None
+    python_commands = []
+    for statement in mel_line.statements:
+        python_command = transpile_statement(statement, target)
+        if python_command is None:
+            return None #一つでも変換できない文があれば行全体をmel.evalで実行
+        python_commands.append(python_command)
+    return python_commands
+
+
+def transpile_batched_mel_command(mel_command, batch_target="chunk"):
+    mel_line = parse_mel_line(mel_command)
+    if mel_line.is_open or not mel_line.statements:
+        return None
+    if any(placeholder != "obj" for placeholder in PLACEHOLDER_PATTERN.findall(mel_command)):
+        return None #オブジェクトごとに値が変わる変数や生成ノードを使うコマンドはループ内に残す
+    python_commands = []
+    for statement in mel_line.statements:
+        if statement.command not in BATCHABLE_COMMANDS:
+            return None
+        if any("{obj}" not in token.text for token in statement_object_tokens(statement)):
+            return None #対象オブジェクト以外を操作するコマンドはまとめない
+        python_command = transpile_statement(statement, "obj", batch_target)
+        if python_command is None:
+            return None
+        python_commands.append(python_command)
+    return python_commands
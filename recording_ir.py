@@ -0,0 +1,109 @@
+import json
+
+RECORDING_FORMAT_VERSION = 1
+RECORDING_FILE_SUFFIX = ".recording.json"
+
+
+class RecordedCommand:
+    __slots__ = ("mel", "variables")
+
+    def __init__(self, mel, variables=None):
+        self.mel = mel
+        self.variables = variables or [] #この行に設定された変数名
+
+    def to_dict(self):
+        if self.variables:
+            return {"mel": self.mel, "variables": list(self.variables)}
+        return {"mel": self.mel}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["mel"], list(data.get("variables", [])))
+
+
+def split_variable_type(var_type):
+    #"float3" -> ("float", 3)、スカラーの型は要素数0
+    base_type = var_type.rstrip("0123456789")
+    return base_type, int(var_type[len(base_type):] or 0)
+
+
+class ParameterSpec:
+    __slots__ = ("name", "var_type", "original_line", "iteration", "random_range", "field")
+
+    def __init__(self, name, var_type, original_line="", iteration=None, random_range=None, field=None):
+        self.name = name
+        self.var_type = var_type #int, float, string, またはfloat3・int2のようなベクトル
+        self.original_line = original_line #変数化する前のMELコマンド(変数削除時に戻すため)
+        self.iteration = iteration #イテレーション式
+        self.random_range = random_range #ランダム化する範囲(from, to)
+        self.field = field #ランプ・ノイズ・カーブで値を決める設定(field_driver.make_fieldの戻り値)
+
+    @property
+    def is_ui_variable(self):
+        return self.iteration is None and self.random_range is None and self.field is None
+
+    def to_dict(self):
+        data = {"name": self.name, "type": self.var_type, "original_line": self.original_line}
+        if self.iteration is not None:
+            data["iteration"] = self.iteration
+        if self.random_range is not None:
+            data["random_range"] = list(self.random_range)
+        if self.field is not None:
+            data["field"] = self.field
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        random_range = data.get("random_range")
+        return cls(
+            data["name"],
+            data["type"],
+            data.get("original_line", ""),
+            data.get("iteration"),
+            tuple(random_range) if random_range is not None else None,
+            data.get("field"),
+        )
+
+
+class Recording:
+    __slots__ = ("commands", "parameters", "operating_mesh")
+
+    def __init__(self, commands=None, parameters=None, operating_mesh=None):
+        self.commands = commands or []
+        self.parameters = parameters or []
+        self.operating_mesh = operating_mesh
+
+    @property
+    def mel_records(self):
+        return [command.mel for command in self.commands]
+
+    @classmethod
+    def from_mel_records(cls, mel_records, operating_mesh=None):
+        return cls([RecordedCommand(mel_record) for mel_record in mel_records], [], operating_mesh)
+
+    def to_dict(self):
+        return {
+            "version": RECORDING_FORMAT_VERSION,
+            "operating_mesh": self.operating_mesh,
+            "commands": [command.to_dict() for command in self.commands],
+            "parameters": [parameter.to_dict() for parameter in self.parameters],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version", RECORDING_FORMAT_VERSION) > RECORDING_FORMAT_VERSION:
+            raise ValueError("Recording was saved by a newer version of this tool")
+        return cls(
+            [RecordedCommand.from_dict(command) for command in data.get("commands", [])],
+            [ParameterSpec.from_dict(parameter) for parameter in data.get("parameters", [])],
+            data.get("operating_mesh"),
+        )
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as recording_file:
+            json.dump(self.to_dict(), recording_file, indent=1, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as recording_file:
+            return cls.from_dict(json.load(recording_file))
@@ -0,0 +1,714 @@
+import re
+
+from field_driver import FIELD_CURVE, FIELD_NOISE, field_uses_position, field_uses_ramp
+from iteration_expression import IterationExpression
+from mel_optimizer import optimize_mel_records
+from mel_parser import parse_mel_line
+from mel_transpiler import escape_literal_braces, is_node_name, mel_command_changes_selection, mel_command_creates_nodes, mel_command_depends_on_selection, mel_command_returns_single_node, mel_eval_python, set_attr_values, transpile_batched_mel_command, transpile_mel_command, transpile_transform_fast_path
+from recording_ir import split_variable_type
+
+UNDO_MODE_CHUNK = 0
+UNDO_MODE_FLUSH = 1
+UNDO_MODE_DISABLE = 2
+ORDER_SELECTION = 0
+ORDER_AXIS_X = 1
+ORDER_AXIS_Y = 2
+ORDER_AXIS_Z = 3
+ORDER_DISTANCE = 4
+ORDER_PATH = 5
+ORDER_GRID = 6
+PYTHON_TYPE_NAMES = {"int": "int", "float": "float", "string": "str"}
+RESULT_PATTERN = re.compile(r"//\s*Result:\s*(.*?)\s*(?://)?\s*$")
+
+DEFAULT_OPTIONS = {
+    "transpile_commands": True,
+    "batch_commands": True,
+    "batch_size": 1000,
+    "undo_mode": UNDO_MODE_CHUNK,
+    "flush_undo_every": 500,
+    "suspend_refresh": True,
+    "optimize_commands": True,
+    "modifier_set_attr": False,
+    "benchmark": False,
+    "api_transforms": False,
+    "random_seed": None,
+    "iteration_order": ORDER_SELECTION,
+    "order_point": (0.0, 0.0, 0.0),
+    "grid_cell_size": 1.0,
+}
+
+
+class ScriptGenerator:
+    def __init__(self, recording, script_name="", options=None):
+        self.recording = recording
+        self.options = dict(DEFAULT_OPTIONS)
+        self.options.update(options or {})
+        self.mel_records = recording.mel_records
+        self.removed_command_count = 0 #最適化で削除されたコマンド数
+        if self.options["optimize_commands"]:
+            self.mel_records, self.removed_command_count = optimize_mel_records(self.mel_records)
+        self.operating_mesh = recording.operating_mesh
+        self.variable_name_dict = {parameter.name: parameter.var_type for parameter in recording.parameters}
+        self.variable_iteration_dict = {parameter.name: parameter.iteration for parameter in recording.parameters if parameter.iteration is not None}
+        #イテレーション式は許可した構文だけかを検査してから生成コードに埋め込む(不正な式はIterationExpressionError)
+        self.iteration_expressions = {variable: IterationExpression(expression) for variable, expression in self.variable_iteration_dict.items()}
+        self.random_variable_dict = {parameter.name: f"{parameter.random_range[0]}, {parameter.random_range[1]}" for parameter in recording.parameters if parameter.random_range is not None}
+        #オブジェクトごとに値が変わる変数(operationの引数になる順)
+        self.field_variable_dict = {parameter.name: parameter.field for parameter in recording.parameters if parameter.field is not None and parameter.name not in self.variable_iteration_dict}
+        self.ui_variables = [parameter.name for parameter in recording.parameters if parameter.is_ui_variable] #ウィンドウで値を入力する変数
+        self.table_variables = [variable for variable in self.variable_name_dict if variable not in self.ui_variables]
+        self.iteration_order = self.options["iteration_order"] if self.table_variables else ORDER_SELECTION #並び順はiの値にだけ影響する
+        self.script_name = script_name
+        self.python_lines = []
+
+    def result_node_names(self, mel_command, previous_command):
+        #ノードを生成したコマンドの結果行からノード名だけを取り出す(問い合わせの数値などは除く)
+        result = RESULT_PATTERN.match(mel_command)
+        if not result or previous_command is None or not mel_command_creates_nodes(previous_command):
+            return []
+        return [name for name in result.group(1).split() if is_node_name(name)]
+
+    def compile_node_pattern(self):
+        #記録全体から生成ノード名を集め、一つの正規表現にまとめてコンパイルする
+        node_definitions = {} #ノード名 -> [(生成された行番号, 置換後の変数)]
+        if self.operating_mesh:
+            node_definitions[self.operating_mesh] = [(-1, "{obj}")]
+        generated_node_index = 0
+        previous_command = None #結果行の直前のコマンド
+        for record_index, mel_command in enumerate(self.mel_records):
+            if mel_command and not parse_mel_line(mel_command).is_comment_only:
+                previous_command = mel_command
+                continue
+            node_names = self.result_node_names(mel_command, previous_command)
+            if not node_names:
+                continue
+            for name_index, node_name in enumerate(node_names):
+                node_definitions.setdefault(node_name, []).append((record_index, "{new_node_" + str(generated_node_index) + "[" + str(name_index) + "]}"))
+            generated_node_index += 1
+        if not node_definitions:
+            return None, node_definitions
+        alternation = "|".join(re.escape(node_name) for node_name in sorted(node_definitions, key=len, reverse=True))
+        #pCube10の中のpCube1のような部分一致は置換しない(シェイプ名のpCube1Shapeは置換する)
+        node_pattern = re.compile(r"(?<![\w{])(" + alternation + r")(?=Shape\d*\b|(?![\w}]))")
+        return node_pattern, node_definitions
+
+    def replace_node_names(self, node_pattern, node_definitions, mel_command, record_index):
+        def node_variable(match):
+            replacement = match.group(0)
+            for created_index, variable in node_definitions[match.group(1)]:
+                if created_index >= record_index:
+                    break
+                replacement = variable #この行より前に生成された最新のノードを使う
+            return replacement
+        return node_pattern.sub(node_variable, mel_command) #全ノード名を一回の走査で置換
+
+    def generate_python_fucntion(self):
+        command_entries = [] #コマンドごとのMEL・Pythonコード・選択依存の情報
+        generated_node_index = 0
+        selection_is_target = True #選択が対象オブジェクトのままかどうか(新規ノード生成で選択が切り替わる)
+        node_pattern, node_definitions = self.compile_node_pattern()
+        previous_command = None
+        for record_index, mel_command in enumerate(self.mel_records):
+            if mel_command == "": 
+                continue
+            elif parse_mel_line(mel_command).is_comment_only:
+                if self.result_node_names(mel_command, previous_command) and command_entries:
+                    command_entries[-1]["node_variable"] = f"new_node_{generated_node_index}"
+                    generated_node_index += 1
+                    selection_is_target = False
+                elif self.result_node_names(mel_command, previous_command):
+                    generated_node_index += 1 #対応するコマンドがない結果行も番号だけは進める
+            else:
+                previous_command = mel_command
+                mel_command = escape_literal_braces(mel_command, self.variable_name_dict) #変数以外の波括弧は文字どおりに扱う
+                if node_pattern is not None: #生成されたノードと操作対象メッシュの名前を変数に置換
+                    mel_command = self.replace_node_names(node_pattern, node_definitions, mel_command, record_index)
+                target = "obj" if selection_is_target else None #選択の代わりに対象オブジェクトを引数で渡す
+                python_commands = transpile_mel_command(mel_command, target) if self.options["transpile_commands"] else None #対応表にあるコマンドはcmdsの呼び出しに直接変換
+                needs_selection = (python_commands is None or target is None) and mel_command_depends_on_selection(mel_command)
+                if mel_command_changes_selection(mel_command):
+                    selection_is_target = False
+                fast_path = transpile_transform_fast_path(mel_command, target) if self.options["api_transforms"] and python_commands is not None and len(python_commands) == 1 else None
+                if fast_path is not None:
+                    python_commands = [f"{fast_path} or {python_commands[0]}"] #OpenMayaで適用できない場合はcmdsで実行
+                if python_commands is None:
+                    python_commands = [mel_eval_python(mel_command)] #変換できないコマンドはmel.evalで実行
+                command_entries.append({
+                    "mel": mel_command,
+                    "python": python_commands,
+                    "target": target,
+                    "needs_selection": needs_selection,
+                    "node_variable": None,
+                })
+        return command_entries
+
+    def batch_python_command(self, command_entries, entry_index):
+        command_entry = command_entries[entry_index]
+        if command_entry["needs_selection"]:
+            return None #選択が対象オブジェクトから切り替わった後のコマンドはまとめない
+        if command_entry["node_variable"]:
+            node_reference = command_entry["node_variable"] + "["
+            if any(node_reference in python_line for later_entry in command_entries[entry_index + 1:] for python_line in later_entry["python"]):
+                return None #生成ノードを後のコマンドが使う場合はループ内に残す
+        return transpile_batched_mel_command(command_entry["mel"])
+
+    def arrange_python_commands(self, command_entries):
+        #ループの前後に連続する一括処理可能なコマンドはオブジェクトごとの処理順を変えずにまとめて実行できる
+        batched_before = []
+        batched_after = []
+        first = 0
+        last = len(command_entries)
+        if self.options["batch_commands"]:
+            while first < last:
+                batched_commands = self.batch_python_command(command_entries, first)
+                if batched_commands is None:
+                    break
+                batched_before.extend(batched_commands)
+                first += 1
+            while last > first:
+                batched_commands = self.batch_python_command(command_entries, last - 1)
+                if batched_commands is None:
+                    break
+                batched_after[:0] = batched_commands
+                last -= 1
+        python_script_ls = []
+        needs_selection = False
+        attribute_values = [] #連続したsetAttrの(プラグ, 値)
+        for command_entry in command_entries[first:last]:
+            set_attr_value = set_attr_values(command_entry["mel"]) if self.options["modifier_set_attr"] and not command_entry["node_variable"] else None
+            if set_attr_value is not None:
+                plug, values = set_attr_value
+                attribute_values.append(f"({plug}, ({', '.join(values)},))")
+                continue
+            if attribute_values:
+                python_script_ls.append(f"set_attributes([{', '.join(attribute_values)}])") #連続したsetAttrを一回のMDGModifierで書き込む
+                attribute_values = []
+            python_commands = list(command_entry["python"])
+            if command_entry["node_variable"]:
+                if mel_command_returns_single_node(command_entry["mel"]):
+                    python_commands[-1] = f"[{python_commands[-1]}]" #new_node_0[0]で参照できるようにリストにする
+                python_commands[-1] = f"{command_entry['node_variable']} = " + python_commands[-1]
+            python_script_ls.extend(python_commands)
+            needs_selection = needs_selection or command_entry["needs_selection"]
+        if attribute_values:
+            python_script_ls.append(f"set_attributes([{', '.join(attribute_values)}])")
+        return batched_before, python_script_ls, batched_after, needs_selection
+    
+    def write_py(self, py, indentaion):
+        self.python_lines.append("    " * indentaion + py) #Qtを使わずリストに書き溜める
+
+    def write_batched_py(self, batched_commands, indentaion):
+        if not batched_commands:
+            return
+        self.write_py("for start in range(0, len(selected_objects), BATCH_SIZE):", indentaion)
+        self.write_py("chunk = cmds.ls(selected_objects[start:start + BATCH_SIZE]) #UUIDから現在の名前を一括で取得", indentaion + 1)
+        self.write_py("if not chunk:", indentaion + 1)
+        self.write_py("continue", indentaion + 2)
+        for python_line in batched_commands:
+            self.write_py(python_line, indentaion + 1)
+
+    def write_set_attributes_py(self):
+        #生成スクリプトに埋め込む、setAttrをまとめて書き込む関数
+        self.write_py("def set_attributes(attribute_values):", 0)
+        self.write_py("global attribute_write_count", 1)
+        self.write_py("attribute_write_count += len(attribute_values)", 1)
+        self.write_py("if om is None:", 1)
+        self.write_py("for plug_name, values in attribute_values:", 2)
+        self.write_py("cmds.setAttr(plug_name, *values)", 3)
+        self.write_py("return", 2)
+        self.write_py("modifier = om.MDGModifier() #MDGModifierでの変更はUndoできない", 1)
+        self.write_py("fallback_values = []", 1)
+        self.write_py("for plug_name, values in attribute_values:", 1)
+        self.write_py("try:", 2)
+        self.write_py("plug = om.MSelectionList().add(plug_name).getPlug(0)", 3)
+        self.write_py("plugs = [plug.child(index) for index in range(plug.numChildren())] if plug.isCompound else [plug]", 3)
+        self.write_py("if len(plugs) != len(values):", 3)
+        self.write_py("raise ValueError(plug_name)", 4)
+        self.write_py("for value_plug, value in zip(plugs, values):", 3)
+        self.write_py("set_plug_value(modifier, value_plug, value)", 4)
+        self.write_py("except (RuntimeError, TypeError, ValueError):", 2)
+        self.write_py("fallback_values.append((plug_name, values)) #APIで書き込めないアトリビュートはcmdsで書き込む", 3)
+        self.write_py("modifier.doIt()", 1)
+        self.write_py("for plug_name, values in fallback_values:", 1)
+        self.write_py("cmds.setAttr(plug_name, *values)", 2)
+        self.write_py("", 0)
+        self.write_py("def set_plug_value(modifier, plug, value):", 0)
+        self.write_py("attribute = plug.attribute()", 1)
+        self.write_py("if attribute.hasFn(om.MFn.kUnitAttribute):", 1)
+        self.write_py("unit_type = om.MFnUnitAttribute(attribute).unitType()", 2)
+        self.write_py("if unit_type == om.MFnUnitAttribute.kAngle:", 2)
+        self.write_py("modifier.newPlugValueMAngle(plug, om.MAngle(value, om.MAngle.uiUnit())) #setAttrと同じくUIの単位で指定", 3)
+        self.write_py("elif unit_type == om.MFnUnitAttribute.kDistance:", 2)
+        self.write_py("modifier.newPlugValueMDistance(plug, om.MDistance(value, om.MDistance.uiUnit()))", 3)
+        self.write_py("else:", 2)
+        self.write_py("raise TypeError(plug.name())", 3)
+        self.write_py("elif attribute.hasFn(om.MFn.kEnumAttribute):", 1)
+        self.write_py("modifier.newPlugValueInt(plug, int(value))", 2)
+        self.write_py("elif attribute.hasFn(om.MFn.kNumericAttribute):", 1)
+        self.write_py("numeric_type = om.MFnNumericAttribute(attribute).numericType()", 2)
+        self.write_py("if numeric_type == om.MFnNumericData.kBoolean:", 2)
+        self.write_py("modifier.newPlugValueBool(plug, bool(value))", 3)
+        self.write_py("elif numeric_type in (om.MFnNumericData.kFloat, om.MFnNumericData.kDouble):", 2)
+        self.write_py("modifier.newPlugValueDouble(plug, float(value))", 3)
+        self.write_py("else:", 2)
+        self.write_py("modifier.newPlugValueInt(plug, int(value))", 3)
+        self.write_py("else:", 1)
+        self.write_py("raise TypeError(plug.name())", 2)
+        self.write_py("", 0)
+
+    def write_apply_transform_py(self):
+        #生成スクリプトに埋め込む、MFnTransformで移動・回転・スケールを適用する関数
+        self.write_py("transform_functions = {} #ノード名 -> (MObjectHandle, MFnTransform)、オブジェクトごとに一度だけ解決する", 0)
+        self.write_py("", 0)
+        self.write_py("def transform_function(node):", 0)
+        self.write_py("cached = transform_functions.get(node)", 1)
+        self.write_py("if cached is not None and cached[0].isValid():", 1)
+        self.write_py("return cached[1]", 2)
+        self.write_py("try:", 1)
+        self.write_py("dag_path = om.MSelectionList().add(node).getDagPath(0)", 2)
+        self.write_py("if not dag_path.hasFn(om.MFn.kTransform):", 2)
+        self.write_py("return None", 3)
+        self.write_py("transform_functions[node] = (om.MObjectHandle(dag_path.node()), om.MFnTransform(dag_path))", 2)
+        self.write_py("except (RuntimeError, TypeError):", 1)
+        self.write_py("return None", 2)
+        self.write_py("return transform_functions[node][1]", 1)
+        self.write_py("", 0)
+        self.write_py("def apply_transform(node, channel, values, is_relative, space):", 0)
+        self.write_py("transform = transform_function(node) if om is not None else None", 1)
+        self.write_py("if transform is None:", 1)
+        self.write_py("return False", 2)
+        self.write_py("if channel == \"translate\":", 1)
+        self.write_py("vector = om.MVector(*[om.MDistance.uiToInternal(value) for value in values]) #MELと同じくUIの単位で指定", 2)
+        self.write_py("if is_relative:", 2)
+        self.write_py("transform.translateBy(vector, getattr(om.MSpace, space))", 3)
+        self.write_py("else:", 2)
+        self.write_py("transform.setTranslation(vector, getattr(om.MSpace, space))", 3)
+        self.write_py("elif channel == \"rotate\":", 1)
+        self.write_py("rotation = transform.rotation(om.MSpace.kTransform) #回転順序はオブジェクトの設定のまま", 2)
+        self.write_py("radians = [om.MAngle.uiToInternal(value) for value in values]", 2)
+        self.write_py("if is_relative:", 2)
+        self.write_py("radians = [rotation.x + radians[0], rotation.y + radians[1], rotation.z + radians[2]]", 3)
+        self.write_py("rotation.x, rotation.y, rotation.z = radians", 2)
+        self.write_py("transform.setRotation(rotation, om.MSpace.kTransform)", 2)
+        self.write_py("else:", 1)
+        self.write_py("scale = transform.scale()", 2)
+        self.write_py("if is_relative:", 2)
+        self.write_py("values = [scale[0] * values[0], scale[1] * values[1], scale[2] * values[2]]", 3)
+        self.write_py("transform.setScale([float(value) for value in values])", 2)
+        self.write_py("return True", 1)
+        self.write_py("", 0)
+
+    def write_replay_py(self, batched_before, has_operation, batched_after, needs_selection, indentaion):
+        undo_mode = self.options["undo_mode"]
+        suspend_refresh = self.options["suspend_refresh"]
+        if self.options["modifier_set_attr"]:
+            self.write_py("if BENCHMARK:", indentaion)
+            self.write_py("global attribute_write_count", indentaion + 1)
+            self.write_py("attribute_write_count = 0", indentaion + 1)
+            self.write_py("start_time = time.perf_counter()", indentaion + 1)
+        if self.options["api_transforms"]:
+            self.write_py("transform_functions.clear()", indentaion)
+        if self.uses_object_positions():
+            self.write_py("position_cache.clear() #前回の実行の後に動いたオブジェクトの位置を使わない", indentaion)
+        if self.iteration_order != ORDER_SELECTION:
+            self.write_py("selected_objects = ordered_objects(selected_objects) #iは並べ替えた後の順番", indentaion)
+        self.write_py("undo_state = cmds.undoInfo(q=True, state=True)", indentaion)
+        if undo_mode == UNDO_MODE_CHUNK:
+            self.write_py("cmds.undoInfo(openChunk=True)", indentaion) #一回のUndoで元に戻せるようにまとめる
+        elif undo_mode == UNDO_MODE_DISABLE:
+            self.write_py("cmds.undoInfo(stateWithoutFlush=False)", indentaion)
+        if suspend_refresh:
+            self.write_py("cmds.refresh(suspend=True)", indentaion) #ビューポートの再描画を停止
+        self.write_py("try:", indentaion)
+        self.write_batched_py(batched_before, indentaion + 1)
+        if has_operation:
+            if self.table_variables:
+                self.write_py("parameter_rows = parameter_table(selected_objects)", indentaion + 1)
+            if self.table_variables:
+                object_rows = "uuid, row in zip(selected_objects, parameter_rows)"
+                if undo_mode == UNDO_MODE_FLUSH:
+                    object_rows = "index, (uuid, row) in enumerate(zip(selected_objects, parameter_rows))"
+            elif undo_mode == UNDO_MODE_FLUSH:
+                object_rows = "index, uuid in enumerate(selected_objects)"
+            else:
+                object_rows = "uuid in selected_objects"
+            self.write_py(f"for {object_rows}:", indentaion + 1)
+            self.write_py("obj = target_name(uuid) #前のオブジェクトの操作で名前や親が変わっても現在のパスを使う", indentaion + 2)
+            self.write_py("if obj is None:", indentaion + 2)
+            self.write_py("continue #削除されたオブジェクト", indentaion + 3)
+            if needs_selection:
+                self.write_py("cmds.select(obj, replace=True)", indentaion + 2)
+            if self.table_variables:
+                self.write_py("operation(obj, *row)", indentaion + 2)
+            else:
+                self.write_py("operation(obj)", indentaion + 2)
+            if undo_mode == UNDO_MODE_FLUSH:
+                self.write_py("if (index + 1) % FLUSH_UNDO_EVERY == 0:", indentaion + 2)
+                self.write_py("cmds.flushUndo()", indentaion + 3) #Undoキューが溜まり続けないよう定期的に破棄
+        self.write_batched_py(batched_after, indentaion + 1)
+        if not (batched_before or has_operation or batched_after):
+            self.write_py("pass", indentaion + 1)
+        self.write_py("finally:", indentaion) #エラーが起きても必ず元の状態に戻す
+        if suspend_refresh:
+            self.write_py("cmds.refresh(suspend=False)", indentaion + 1)
+        if undo_mode == UNDO_MODE_CHUNK:
+            self.write_py("cmds.undoInfo(closeChunk=True)", indentaion + 1)
+        self.write_py("cmds.undoInfo(stateWithoutFlush=undo_state)", indentaion + 1)
+        if self.options["modifier_set_attr"]:
+            self.write_py("if BENCHMARK:", indentaion)
+            self.write_py("elapsed_time = max(time.perf_counter() - start_time, 1e-9)", indentaion + 1)
+            self.write_py("print(f\"{attribute_write_count} attribute writes in {elapsed_time:.3f} s ({attribute_write_count / elapsed_time:.0f} writes/sec)\")", indentaion + 1)
+
+    def write_imports_py(self):
+        self.python_lines = ["from maya import cmds as cmds"]
+        self.write_py("from maya import mel as mel", 0)
+        if self.random_variable_dict:
+            self.write_py("import random", 0)
+        if any(expression.uses_math for expression in self.iteration_expressions.values()) or any(field_uses_position(field) for field in self.field_variable_dict.values()):
+            self.write_py("import math", 0)
+        if self.options["modifier_set_attr"]:
+            self.write_py("import time", 0)
+        if self.options["modifier_set_attr"] or self.options["api_transforms"]:
+            self.write_py("try:", 0)
+            self.write_py("import maya.api.OpenMaya as om", 1)
+            self.write_py("except ImportError:", 0)
+            self.write_py("om = None #OpenMayaが使えない場合はcmdsで実行", 1)
+        if self.table_variables:
+            self.write_py("try:", 0)
+            self.write_py("import numpy as np", 1)
+            self.write_py("except ImportError:", 0)
+            self.write_py("np = None #NumPyがない場合はPythonのループで計算", 1)
+        self.write_py("", 0)
+
+    def table_uses_positions(self):
+        return any(expression.uses_position for expression in self.iteration_expressions.values()) or any(field_uses_position(field) for field in self.field_variable_dict.values())
+
+    def uses_object_positions(self):
+        return self.table_uses_positions() or self.iteration_order != ORDER_SELECTION
+
+    def write_target_name_py(self):
+        self.write_py("def target_name(uuid):", 0)
+        self.write_py("#UUIDから現在のフルパスを取得する(削除されたオブジェクトはNone)", 1)
+        self.write_py("names = cmds.ls(uuid, long=True)", 1)
+        self.write_py("return names[0] if names else None", 1)
+        self.write_py("", 0)
+
+    def write_object_positions_py(self):
+        #生成スクリプトに埋め込む、全オブジェクトのワールド位置を一回のxformで取得する関数
+        self.write_py("def object_positions(selected_objects):", 0)
+        self.write_py("names = cmds.ls(selected_objects, long=True)", 1)
+        self.write_py("if len(names) == len(selected_objects):", 1)
+        self.write_py("values = cmds.xform(names, q=True, worldSpace=True, translation=True) or []", 2)
+        self.write_py("if len(values) == 3 * len(names):", 2)
+        self.write_py("return [values[index:index + 3] for index in range(0, len(values), 3)]", 3)
+        self.write_py("positions = [] #削除されたオブジェクトがある場合は一つずつ取得", 1)
+        self.write_py("for uuid in selected_objects:", 1)
+        self.write_py("obj = target_name(uuid)", 2)
+        self.write_py("positions.append(cmds.xform(obj, q=True, worldSpace=True, translation=True) if obj is not None else [0.0, 0.0, 0.0])", 2)
+        self.write_py("return positions", 1)
+        self.write_py("", 0)
+        self.write_py("position_cache = {} #UUIDの並び -> ワールド位置、一回の実行の中で同じ選択の位置を二度問い合わせない", 0)
+        self.write_py("", 0)
+        self.write_py("def cached_positions(selected_objects):", 0)
+        self.write_py("key = tuple(selected_objects)", 1)
+        self.write_py("if key not in position_cache:", 1)
+        self.write_py("position_cache[key] = object_positions(selected_objects)", 2)
+        self.write_py("return position_cache[key]", 1)
+        self.write_py("", 0)
+
+    def write_spatial_order_py(self):
+        #生成スクリプトに埋め込む、ワールド位置で選択を並べ替える関数
+        self.write_py(f"ITERATION_ORDER = {self.iteration_order} #1-3: X/Y/Z軸方向, 4: 点からの距離, 5: 最近傍をたどる経路, 6: グリッド", 0)
+        self.write_py(f"ORDER_POINT = {tuple(float(value) for value in self.options['order_point'])}", 0)
+        self.write_py(f"GRID_CELL_SIZE = {float(self.options['grid_cell_size'])}", 0)
+        self.write_py("", 0)
+        self.write_py("def nearest_neighbour_path(positions):", 0)
+        self.write_py("#最初に選択したオブジェクトから、まだ通っていない最も近いオブジェクトを順にたどる(空間ハッシュで近傍だけを探す)", 1)
+        self.write_py("count = len(positions)", 1)
+        self.write_py("extents = [max(position[axis] for position in positions) - min(position[axis] for position in positions) for axis in range(3)]", 1)
+        self.write_py("dimension = max(sum(1 for extent in extents if extent > 0), 1) #平面上に並んでいる場合は二次元として分割する", 1)
+        self.write_py("cell_size = max(max(extents) / max(count ** (1.0 / dimension), 1.0), 1e-6)", 1)
+        self.write_py("max_ring = int(max(extents) / cell_size) + 1", 1)
+        self.write_py("cells = {}", 1)
+        self.write_py("cell_keys = [tuple(int(value // cell_size) for value in position) for position in positions]", 1)
+        self.write_py("low = [min(cell_key[axis] for cell_key in cell_keys) for axis in range(3)]", 1)
+        self.write_py("high = [max(cell_key[axis] for cell_key in cell_keys) for axis in range(3)]", 1)
+        self.write_py("for index, cell_key in enumerate(cell_keys):", 1)
+        self.write_py("cells.setdefault(cell_key, set()).add(index)", 2)
+        self.write_py("order = []", 1)
+        self.write_py("current = 0", 1)
+        self.write_py("while True:", 1)
+        self.write_py("order.append(current)", 2)
+        self.write_py("cell = cells[cell_keys[current]]", 2)
+        self.write_py("cell.discard(current)", 2)
+        self.write_py("if not cell:", 2)
+        self.write_py("del cells[cell_keys[current]]", 3)
+        self.write_py("if not cells:", 2)
+        self.write_py("return order", 3)
+        self.write_py("cx, cy, cz = cell_keys[current]", 2)
+        self.write_py("px, py, pz = positions[current]", 2)
+        self.write_py("best, best_distance = None, None", 2)
+        self.write_py("for ring in range(max_ring + 1):", 2)
+        self.write_py("if best is not None and best_distance <= ((ring - 1) * cell_size) ** 2:", 3)
+        self.write_py("break #これより外側のセルにはもっと近い点はない", 4)
+        self.write_py("for dx in range(max(-ring, low[0] - cx), min(ring, high[0] - cx) + 1): #点のない範囲のセルは調べない", 3)
+        self.write_py("for dy in range(max(-ring, low[1] - cy), min(ring, high[1] - cy) + 1):", 4)
+        self.write_py("if abs(dx) == ring or abs(dy) == ring:", 5)
+        self.write_py("dz_range = range(max(-ring, low[2] - cz), min(ring, high[2] - cz) + 1)", 6)
+        self.write_py("else:", 5)
+        self.write_py("dz_range = {dz for dz in (-ring, ring) if low[2] - cz <= dz <= high[2] - cz} #内側は調べ終わっているので外周だけ", 6)
+        self.write_py("for dz in dz_range:", 5)
+        self.write_py("for index in cells.get((cx + dx, cy + dy, cz + dz), ()):", 6)
+        self.write_py("x, y, z = positions[index]", 7)
+        self.write_py("distance = (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2", 7)
+        self.write_py("if best is None or (distance, index) < (best_distance, best): #同じ距離なら番号の小さい方", 7)
+        self.write_py("best, best_distance = index, distance", 8)
+        self.write_py("current = best", 2)
+        self.write_py("", 0)
+        self.write_py("def spatial_order(positions):", 0)
+        self.write_py("#元の選択での番号を並べ替えた順に返す", 1)
+        self.write_py("if ITERATION_ORDER == 5:", 1)
+        self.write_py("return nearest_neighbour_path(positions)", 2)
+        self.write_py("if np is not None:", 1)
+        self.write_py("points = np.asarray(positions, dtype=float).reshape(-1, 3)", 2)
+        self.write_py("if ITERATION_ORDER == 4:", 2)
+        self.write_py("return np.argsort(np.linalg.norm(points - np.asarray(ORDER_POINT), axis=1), kind=\"stable\").tolist()", 3)
+        self.write_py("if ITERATION_ORDER == 6:", 2)
+        self.write_py("return np.lexsort((points[:, 0], np.floor(points[:, 2] / GRID_CELL_SIZE))).tolist() #Z方向の行ごとにX方向へ並べる", 3)
+        self.write_py("return np.argsort(points[:, ITERATION_ORDER - 1], kind=\"stable\").tolist()", 2)
+        self.write_py("if ITERATION_ORDER == 4:", 1)
+        self.write_py("sort_keys = [sum((value - origin) ** 2 for value, origin in zip(position, ORDER_POINT)) for position in positions]", 2)
+        self.write_py("elif ITERATION_ORDER == 6:", 1)
+        self.write_py("sort_keys = [(position[2] // GRID_CELL_SIZE, position[0]) for position in positions]", 2)
+        self.write_py("else:", 1)
+        self.write_py("sort_keys = [position[ITERATION_ORDER - 1] for position in positions]", 2)
+        self.write_py("return sorted(range(len(positions)), key=sort_keys.__getitem__)", 1)
+        self.write_py("", 0)
+        self.write_py("order_cache = {} #UUIDの並び -> (ワールド位置, 並び順)、どれかのオブジェクトが動くまで並べ替えを再利用する", 0)
+        self.write_py("", 0)
+        self.write_py("def ordered_objects(selected_objects):", 0)
+        self.write_py("key = tuple(selected_objects)", 1)
+        self.write_py("positions = cached_positions(selected_objects)", 1)
+        self.write_py("cached = order_cache.get(key)", 1)
+        self.write_py("if cached is not None and cached[0] == positions:", 1)
+        self.write_py("order = cached[1]", 2)
+        self.write_py("else:", 1)
+        self.write_py("order = spatial_order(positions)", 2)
+        self.write_py("order_cache.clear() #最後に並べ替えた選択だけを残す", 2)
+        self.write_py("order_cache[key] = (positions, order)", 2)
+        self.write_py("ordered = [selected_objects[index] for index in order]", 1)
+        self.write_py("position_cache[tuple(ordered)] = [positions[index] for index in order] #並べ替えた選択の位置もparameter_tableで再利用する", 1)
+        self.write_py("return ordered", 1)
+        self.write_py("", 0)
+
+    def write_value_noise_py(self):
+        #生成スクリプトに埋め込む、ワールド位置から0-1の値を返すバリューノイズ(NumPy配列でも数値でも同じ値になる)
+        self.write_py("def lattice_value(ix, iy, iz, seed):", 0)
+        self.write_py("h = (ix * 73856093 ^ iy * 19349663 ^ iz * 83492791 ^ seed * 2654435761) & 0xFFFFFFFF", 1)
+        self.write_py("h = ((h ^ (h >> 13)) * 1274126177) & 0xFFFFFFFF", 1)
+        self.write_py("return (h ^ (h >> 16)) / 4294967295.0", 1)
+        self.write_py("", 0)
+        self.write_py("def value_noise(x, y, z, seed):", 0)
+        self.write_py("if np is not None and isinstance(x, np.ndarray):", 1)
+        self.write_py("ix, iy, iz = [np.floor(value).astype(np.int64) for value in (x, y, z)]", 2)
+        self.write_py("else:", 1)
+        self.write_py("ix, iy, iz = math.floor(x), math.floor(y), math.floor(z)", 2)
+        self.write_py("weights = []", 1)
+        self.write_py("for value, cell in ((x, ix), (y, iy), (z, iz)):", 1)
+        self.write_py("fraction = value - cell", 2)
+        self.write_py("weights.append(fraction * fraction * (3 - 2 * fraction)) #格子の境目で滑らかにつなぐ", 2)
+        self.write_py("result = 0.0", 1)
+        self.write_py("for dx in (0, 1):", 1)
+        self.write_py("for dy in (0, 1):", 2)
+        self.write_py("for dz in (0, 1):", 3)
+        self.write_py("weight = (weights[0] if dx else 1 - weights[0]) * (weights[1] if dy else 1 - weights[1]) * (weights[2] if dz else 1 - weights[2])", 4)
+        self.write_py("result = result + weight * lattice_value(ix + dx, iy + dy, iz + dz, seed)", 4)
+        self.write_py("return result", 1)
+        self.write_py("", 0)
+
+    def write_interpolate_curve_py(self):
+        #np.interpと同じく、範囲外は両端の値にする折れ線補間
+        self.write_py("def interpolate_curve(t, positions, values):", 0)
+        self.write_py("if t <= positions[0]:", 1)
+        self.write_py("return values[0]", 2)
+        self.write_py("for index in range(1, len(positions)):", 1)
+        self.write_py("if t <= positions[index]:", 2)
+        self.write_py("span = positions[index] - positions[index - 1]", 3)
+        self.write_py("ratio = (t - positions[index - 1]) / span if span else 1.0", 3)
+        self.write_py("return values[index - 1] + (values[index] - values[index - 1]) * ratio", 3)
+        self.write_py("return values[-1]", 1)
+        self.write_py("", 0)
+
+    def write_parameter_table_py(self):
+        #イテレーション・ランダムの値を全オブジェクト分まとめて計算し、ループ内では参照するだけにする
+        columns = []
+        row = []
+        stream_count = 0
+        noise_count = 0
+        for variable in self.table_variables:
+            vector_size = split_variable_type(self.variable_name_dict[variable])[1]
+            is_per_component = False #要素ごとに別の値を計算したかどうか
+            if variable in self.iteration_expressions:
+                columns.append(f"np.broadcast_to({self.iteration_expressions[variable].numpy_source}, (count,))")
+                row.append(self.iteration_expressions[variable].python_source)
+            elif variable in self.field_variable_dict:
+                field = self.field_variable_dict[variable]
+                value_from, value_to = (float(value) for value in field["range"])
+                if field["kind"] == FIELD_NOISE:
+                    frequency = float(field["frequency"])
+                    seed = f"{noise_count} + component" if vector_size else str(noise_count)
+                    field_value = f"{value_from} + {value_to - value_from} * value_noise(x * {frequency}, y * {frequency}, z * {frequency}, {seed})"
+                    noise_count += max(vector_size, 1) #変数ごと・要素ごとに別の模様にする
+                    if vector_size:
+                        columns.append(f"np.stack([{field_value} for component in range({vector_size})], axis=1)")
+                        row.append(f"tuple({field_value} for component in range({vector_size}))")
+                        is_per_component = True
+                    else:
+                        columns.append(field_value)
+                        row.append(field_value)
+                elif field["kind"] == FIELD_CURVE:
+                    curve_inputs = f"{[float(point[0]) for point in field['points']]}, {[float(point[1]) for point in field['points']]}"
+                    columns.append(f"{value_from} + {value_to - value_from} * np.interp(ramp_t, {curve_inputs})")
+                    row.append(f"{value_from} + {value_to - value_from} * interpolate_curve(ramp_t, {curve_inputs})")
+                else:
+                    columns.append(f"{value_from} + {value_to - value_from} * ramp_t")
+                    row.append(f"{value_from} + {value_to - value_from} * ramp_t")
+            elif vector_size:
+                columns.append(f"streams[{stream_count}].uniform({self.random_variable_dict[variable]}, (count, {vector_size}))") #要素ごとに独立した乱数
+                row.append(f"tuple(streams[{stream_count}].uniform({self.random_variable_dict[variable]}) for component in range({vector_size}))")
+                stream_count += 1
+                is_per_component = True
+            else:
+                columns.append(f"streams[{stream_count}].uniform({self.random_variable_dict[variable]}, count)")
+                row.append(f"streams[{stream_count}].uniform({self.random_variable_dict[variable]})")
+                stream_count += 1
+            if vector_size and not is_per_component:
+                #イテレーション・ランプ・カーブはベクトルの全要素に同じ値を使う(均等なスケールなど)
+                columns[-1] = f"np.broadcast_to(np.reshape({columns[-1]}, (-1, 1)), (count, {vector_size}))"
+                row[-1] = f"({row[-1]},) * {vector_size}"
+        if stream_count:
+            self.write_py("def random_stream(stream_index):", 0)
+            self.write_py("#変数ごとに独立した乱数列(同じシードなら毎回同じ値になる)", 1)
+            self.write_py("if np is not None:", 1)
+            self.write_py("return np.random.default_rng(None if RANDOM_SEED is None else [RANDOM_SEED, stream_index])", 2)
+            self.write_py("return random.Random(None if RANDOM_SEED is None else f\"{RANDOM_SEED}:{stream_index}\")", 1)
+            self.write_py("", 0)
+        uses_position = self.table_uses_positions()
+        uses_ramp = any(field_uses_ramp(field) for field in self.field_variable_dict.values())
+        if noise_count:
+            self.write_value_noise_py()
+        if any(field["kind"] == FIELD_CURVE for field in self.field_variable_dict.values()):
+            self.write_interpolate_curve_py()
+        if self.uses_object_positions():
+            self.write_object_positions_py()
+        if self.iteration_order != ORDER_SELECTION:
+            self.write_spatial_order_py()
+        self.write_py("def parameter_table(selected_objects):", 0)
+        self.write_py("count = n = len(selected_objects)", 1)
+        if uses_position:
+            self.write_py("positions = cached_positions(selected_objects)", 1)
+        if stream_count:
+            self.write_py(f"streams = [random_stream(stream_index) for stream_index in range({stream_count})]", 1)
+        self.write_py("if np is not None:", 1)
+        self.write_py("i = np.arange(count, dtype=float) #整数のままだとi ** 4などがオーバーフローする", 2)
+        self.write_py("n = float(count)", 2)
+        if uses_ramp:
+            self.write_py("ramp_t = i / max(count - 1, 1) #選択の最初から最後まで0-1", 2)
+        if uses_position:
+            self.write_py("x, y, z = np.asarray(positions, dtype=float).reshape(-1, 3).T", 2)
+        self.write_py("columns = [", 2)
+        for column in columns:
+            self.write_py(column + ",", 3)
+        self.write_py("]", 2)
+        self.write_py("return list(zip(*[column.tolist() for column in columns]))", 2)
+        self.write_py("rows = []", 1)
+        self.write_py("for i in range(count):", 1)
+        if uses_ramp:
+            self.write_py("ramp_t = i / max(count - 1, 1)", 2)
+        if uses_position:
+            self.write_py("x, y, z = positions[i]", 2)
+        self.write_py(f"rows.append(({', '.join(row)},))", 2)
+        self.write_py("return rows", 1)
+        self.write_py("", 0)
+
+    def write_replay_settings_py(self, batched_before, batched_after):
+        if self.options["modifier_set_attr"]:
+            self.write_py(f"BENCHMARK = {self.options['benchmark']} #Trueにするとアトリビュートの書き込み速度を表示", 0)
+            self.write_py("attribute_write_count = 0", 0)
+        if batched_before or batched_after:
+            self.write_py(f"BATCH_SIZE = {self.options['batch_size']}", 0)
+        if self.options["undo_mode"] == UNDO_MODE_FLUSH:
+            self.write_py(f"FLUSH_UNDO_EVERY = {self.options['flush_undo_every']}", 0)
+        if self.random_variable_dict:
+            self.write_py(f"RANDOM_SEED = {self.options['random_seed']} #整数を指定すると毎回同じ乱数になる", 0)
+        if batched_before or batched_after or self.options["undo_mode"] == UNDO_MODE_FLUSH or self.options["modifier_set_attr"] or self.table_variables:
+            self.write_py("", 0)
+        if self.options["modifier_set_attr"]:
+            self.write_set_attributes_py()
+        if self.options["api_transforms"]:
+            self.write_apply_transform_py()
+        self.write_target_name_py()
+        if self.table_variables:
+            self.write_parameter_table_py()
+
+    def generate_python_script_noui(self):
+        batched_before, python_script_ls, batched_after, needs_selection = self.arrange_python_commands(self.generate_python_fucntion())
+        self.write_imports_py()
+        self.write_replay_settings_py(batched_before, batched_after)
+        self.write_py("def operation(" + ", ".join(["obj"] + self.table_variables) + "):", 0)
+        for python_line in python_script_ls:
+            self.write_py(python_line, 1)
+        if not python_script_ls:
+            self.write_py("pass", 1)
+        self.write_py("", 0)
+        self.write_py("def main():", 0)
+        self.write_py("selected_objects = cmds.ls(selection=True, uuid=True) #選択は一度だけUUIDで取得", 1)
+        self.write_py("if selected_objects:", 1)
+        self.write_replay_py(batched_before, bool(python_script_ls), batched_after, needs_selection, 2)
+        self.write_py("", 0)
+        self.write_py("main()", 0)
+        return "\n".join(self.python_lines)
+
+    def generate_python_script_wui(self):
+        batched_before, python_script_ls, batched_after, needs_selection = self.arrange_python_commands(self.generate_python_fucntion())
+        self.write_imports_py()
+        self.write_replay_settings_py(batched_before, batched_after)
+        self.write_py("def main(*args):", 0)
+        self.write_py("def operation(" + ", ".join(["obj"] + self.table_variables) + "):", 1)
+        for variable in self.ui_variables:
+            base_type, vector_size = split_variable_type(self.variable_name_dict[variable])
+            if vector_size: #ベクトルは空白区切りで入力する
+                self.write_py(f"{variable} = [{PYTHON_TYPE_NAMES[base_type]}(value) for value in cmds.textField(\"{variable}\", q=True, text=True).split()]", 2)
+            else:
+                self.write_py(f"{variable} = {PYTHON_TYPE_NAMES[base_type]}(cmds.textField(\"{variable}\", q=True, text=True))", 2)
+        for python_line in python_script_ls:
+            self.write_py(python_line, 2)
+        if not python_script_ls:
+            self.write_py("pass", 2)
+        self.write_py("", 1)
+        self.write_py("def myfunction(*args):", 1)
+        self.write_py("selected_objects = cmds.ls(selection=True, uuid=True) #選択は一度だけUUIDで取得", 2)
+        self.write_py("if selected_objects:", 2)
+        self.write_replay_py(batched_before, bool(python_script_ls), batched_after, needs_selection, 3)
+        self.write_py("", 1)
+        self.write_py(f"title = \"{self.script_name}\"", 1)
+        self.write_py("if cmds.window(title, exists=True):", 1)
+        self.write_py("cmds.deleteUI(title)", 2)
+        self.write_py("GUI = cmds.window(title, title=title, w=450, h=430, s=True)", 1)
+        self.write_py(f"cmds.columnLayout(columnAttach=('both', {1+len(self.variable_name_dict)}), rowSpacing=10, columnWidth=500)", 1)
+        self.write_py("", 1)
+        self.write_py("cmds.rowLayout(nc=2, cw2=[100,100])", 1)
+        self.write_py("cmds.text(\" \")", 1)
+        self.write_py("cmds.button(label=\"Run\", c=myfunction, width=100)", 1)
+        self.write_py("cmds.setParent(\"..\")", 1)
+        self.write_py("", 1)
+        for variable in self.ui_variables:
+            self.write_py("cmds.rowLayout(nc=2, cw2=[100,100])", 1)
+            self.write_py(f"cmds.text(\"{variable}\")", 1)
+            self.write_py(f"cmds.textField(\"{variable}\", text=None, w=100)", 1)
+            self.write_py("cmds.setParent(\"..\")", 1)
+        self.write_py("", 1)
+        self.write_py("cmds.showWindow(GUI)", 1)
+        self.write_py("", 0)
+        self.write_py("main()", 0)
+        return "\n".join(self.python_lines)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) #リポジトリ直下のモジュールを読み込む
+
+from benchmark_replay import install_stand_in_maya
+
+MAYA_MODULE_NAMES = ("maya", "maya.cmds", "maya.mel")
+
+
+@pytest.fixture
+def stand_in_maya():
+    #benchmark_replayの代わりのcmds/melを入れ、テストの後に元に戻す
+    saved_modules = {name: sys.modules.get(name) for name in MAYA_MODULE_NAMES}
+    yield install_stand_in_maya
+    for name, module in saved_modules.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
@@ -0,0 +1,118 @@
+import sys
+import types
+
+from mel_transpiler import transpile_transform_fast_path
+from recording_ir import Recording
+from script_generator import ScriptGenerator
+
+MEL_RECORDS = ["move -r 0 1 0;", "scale -r 2 2 2;", "move -r 0 0 1 \"pCube1.vtx[0]\";"]
+
+
+def test_fast_path_expressions():
+    assert transpile_transform_fast_path("move -r 0 1 0;", "obj") == "apply_transform(obj, \"translate\", (0, 1, 0), True, \"kWorld\")"
+    assert transpile_transform_fast_path("xform -ro 0 90 0;", "obj") == "apply_transform(obj, \"rotate\", (0, 90, 0), False, \"kTransform\")"
+    assert transpile_transform_fast_path("move -r 0 0 1 \"pCube1.vtx[0]\";", "obj") is None #コンポーネントはcmdsで処理
+    assert transpile_transform_fast_path("move -r -os 0 1 0;", "obj") is None #対応表にない組み合わせ
+    assert transpile_transform_fast_path("move -r 0 1 0;") is None #対象オブジェクトが分からない
+
+
+class StandInTransform:
+    def __init__(self, node):
+        self.node = node
+        self.scale_values = [1.0, 1.0, 1.0]
+        self.operations = []
+
+    def translateBy(self, vector, space):
+        self.operations.append(("translateBy", vector, space))
+
+    def scale(self):
+        return list(self.scale_values)
+
+    def setScale(self, values):
+        self.scale_values = values
+        self.operations.append(("setScale", values))
+
+
+class StandInDagPath:
+    def __init__(self, node):
+        self.dag_node = node
+
+    def hasFn(self, kind):
+        return kind == "transform"
+
+    def node(self):
+        return self.dag_node
+
+
+class StandInOpenMaya(types.ModuleType):
+    #MFnTransformの呼び出しを記録するだけのOpenMaya
+    def __init__(self):
+        super().__init__("maya.api.OpenMaya")
+        self.transforms = {}
+        self.resolve_count = 0
+        self.MFn = types.SimpleNamespace(kTransform="transform")
+        self.MSpace = types.SimpleNamespace(kWorld="world", kTransform="object")
+        self.MDistance = types.SimpleNamespace(uiToInternal=lambda value: float(value))
+        self.MVector = lambda *values: tuple(values)
+        stand_in = self
+
+        class MSelectionList:
+            def add(self, node):
+                stand_in.resolve_count += 1
+                self.node = node
+                return self
+
+            def getDagPath(self, index):
+                return StandInDagPath(self.node)
+
+        class MObjectHandle:
+            def __init__(self, node):
+                pass
+
+            def isValid(self):
+                return True
+
+        def MFnTransform(dag_path):
+            return stand_in.transforms.setdefault(dag_path.node(), StandInTransform(dag_path.node()))
+
+        self.MSelectionList = MSelectionList
+        self.MObjectHandle = MObjectHandle
+        self.MFnTransform = MFnTransform
+
+
+def replay(stand_in_maya, monkeypatch, open_maya=None):
+    python_script = ScriptGenerator(Recording.from_mel_records(MEL_RECORDS, "pCube1"), options={"api_transforms": True}).generate_python_script_noui()
+    cmds = stand_in_maya(2)
+    if open_maya is not None:
+        api = types.ModuleType("maya.api")
+        api.OpenMaya = open_maya
+        monkeypatch.setitem(sys.modules, "maya.api", api)
+        monkeypatch.setitem(sys.modules, "maya.api.OpenMaya", open_maya)
+        sys.modules["maya"].api = api
+    exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+    return cmds
+
+
+def transform_calls(cmds):
+    return [(name, args) for name, args, kwargs in cmds.calls if name in ("move", "scale")]
+
+
+def test_cmds_fallback_without_open_maya(stand_in_maya, monkeypatch):
+    cmds = replay(stand_in_maya, monkeypatch)
+    assert transform_calls(cmds) == [
+        ("move", (0, 1, 0, "pCube0")),
+        ("scale", (2, 2, 2, "pCube0")),
+        ("move", (0, 0, 1, "pCube0.vtx[0]")), #操作対象メッシュのコンポーネントは各オブジェクトに置き換わる
+        ("move", (0, 1, 0, "pCube1")),
+        ("scale", (2, 2, 2, "pCube1")),
+        ("move", (0, 0, 1, "pCube1.vtx[0]")),
+    ]
+
+
+def test_transforms_are_applied_through_open_maya(stand_in_maya, monkeypatch):
+    open_maya = StandInOpenMaya()
+    cmds = replay(stand_in_maya, monkeypatch, open_maya)
+    assert transform_calls(cmds) == [("move", (0, 0, 1, "pCube0.vtx[0]")), ("move", (0, 0, 1, "pCube1.vtx[0]"))] #コンポーネントだけcmdsで実行
+    assert open_maya.transforms["pCube0"].operations == [("translateBy", (0.0, 1.0, 0.0), "world"), ("setScale", [2.0, 2.0, 2.0])]
+    assert open_maya.transforms["pCube1"].operations == open_maya.transforms["pCube0"].operations
+    assert open_maya.resolve_count == 2 #MFnTransformはオブジェクトごとに一度だけ作る
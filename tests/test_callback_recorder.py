@@ -0,0 +1,54 @@
+from callback_recorder import CallbackRecorder, LocalEventSource
+
+
+def test_local_events_become_mel_records():
+    event_source = LocalEventSource()
+    recorder = CallbackRecorder(event_source, "pCube1")
+    recorder.start()
+    event_source.add_node("group1", "transform")
+    event_source.add_node("locator1", "transform", "group1")
+    event_source.set_attribute("pCube1.translateY", 2.5)
+    event_source.set_attribute("pCube1.translateY", 3.0) #同じプラグは最後の値を一つだけ残す
+    event_source.set_attribute("pCube1.translate", [(1.0, 2.0, 3.0)])
+    event_source.set_attribute("locator1.visibility", False)
+    recording = recorder.stop()
+    assert recording.mel_records == [
+        "createNode transform -n \"group1\";",
+        "// Result: group1 //",
+        "createNode transform -n \"locator1\" -p \"group1\";",
+        "// Result: locator1 //",
+        "setAttr \"pCube1.translateY\" 3.0;",
+        "setAttr \"pCube1.translate\" 1.0 2.0 3.0;",
+        "setAttr \"locator1.visibility\" 0;",
+    ]
+    assert recording.operating_mesh == "pCube1"
+
+
+def test_deleted_nodes_and_paused_events_are_not_recorded():
+    event_source = LocalEventSource()
+    recorder = CallbackRecorder(event_source)
+    recorder.start()
+    event_source.add_node("pSphere1", "transform")
+    event_source.set_attribute("pSphere1.translateX", 1.0)
+    event_source.delete_node("pSphere1")
+    recorder.pause()
+    event_source.set_attribute("pCube1.translateX", 1.0)
+    assert recorder.stop().mel_records == []
+
+
+def test_shapes_and_history_nodes_are_not_recorded():
+    event_source = LocalEventSource()
+    recorder = CallbackRecorder(event_source, "pCube1")
+    recorder.start()
+    event_source.add_node("pSphere1", "transform")
+    event_source.add_node("pSphereShape1", "mesh", "pSphere1")
+    event_source.add_node("polySphere1", "polySphere")
+    event_source.set_attribute("polySphere1.radius", 2.0)
+    event_source.set_attribute("pSphere1.translateX", 1.0)
+    recording = recorder.stop()
+    assert recording.mel_records == [
+        "createNode transform -n \"pSphere1\";",
+        "// Result: pSphere1 //",
+        "setAttr \"pSphere1.translateX\" 1.0;",
+    ]
+    assert all(command.variables == [] for command in recording.commands)
@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+from capture_filter import DEFAULT_CAPTURE_RULES, EXCLUDE, INCLUDE, STOP, CaptureFilter
+
+
+def test_default_rules():
+    capture_filter = CaptureFilter()
+    assert capture_filter.classify("import AutoScripting") == STOP
+    assert capture_filter.classify("select -r pCube1 ;") == EXCLUDE
+    assert capture_filter.classify("move -r 0 1 0 ;") is None
+
+
+def test_command_rule_does_not_match_longer_names():
+    capture_filter = CaptureFilter({EXCLUDE: [{"command": "select"}]})
+    assert capture_filter.classify("selectMode -object;") is None
+    assert capture_filter.classify("  select -cl;") == EXCLUDE
+
+
+def test_stop_has_priority_over_include():
+    capture_filter = CaptureFilter({STOP: [{"regex": "Export"}], INCLUDE: [{"prefix": "file"}]})
+    assert capture_filter.classify("file -force -options \"\" -typ \"FBX export\" -pr -es \"a.fbx\";") == INCLUDE
+    assert capture_filter.classify("fileExport;") == STOP
+
+
+def test_invalid_regex_is_reported():
+    with pytest.raises(re.error):
+        CaptureFilter({EXCLUDE: [{"regex": "("}]})
+
+
+def test_echo_noise_is_excluded_only_in_echo_mode():
+    echo_filter = CaptureFilter(exclude_echo_noise=True)
+    assert echo_filter.classify("getAttr pCube1.tx;") == EXCLUDE
+    assert echo_filter.classify("polyCube -q -w pCube1;") == EXCLUDE
+    assert echo_filter.classify("// Result: a -q b //") is None
+    assert echo_filter.classify("polyCube;") is None
+    assert CaptureFilter().classify("getAttr pCube1.tx;") is None
+
+
+def test_include_rules_rescue_echo_noise():
+    rules = dict(DEFAULT_CAPTURE_RULES, include=[{"command": "performPolyExtrude"}])
+    echo_filter = CaptureFilter(rules, exclude_echo_noise=True)
+    assert echo_filter.classify("performPolyExtrude 0;") == INCLUDE
+    assert echo_filter.classify("performPolyBevel 0;") == EXCLUDE
+
+
+def test_user_regex_groups_do_not_shift_categories():
+    capture_filter = CaptureFilter({
+        STOP: [{"regex": r"(?P<stop>quit)"}],
+        INCLUDE: [{"regex": r"(set)Attr (\S+) \2"}],
+        EXCLUDE: [{"regex": r"(?P<stop>Attr)"}, {"command": "getAttr"}],
+    })
+    assert capture_filter.classify("quit;") == STOP
+    assert capture_filter.classify("setAttr a a;") == INCLUDE
+    assert capture_filter.classify("setAttr a b;") == EXCLUDE
+    assert capture_filter.classify("getAttr a;") == EXCLUDE
+    assert capture_filter.classify("polyCube;") is None
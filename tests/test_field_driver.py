@@ -0,0 +1,73 @@
+import pytest
+
+from field_driver import FIELD_CURVE, FIELD_NOISE, FIELD_RAMP, make_field, parse_curve_points
+from recording_ir import ParameterSpec, RecordedCommand, Recording
+from script_generator import ScriptGenerator
+
+OBJECT_COUNT = 40
+
+
+def test_curve_points_are_sorted_and_validated():
+    assert parse_curve_points("1 0, 0 0.5, 0.5 1") == [[0.0, 0.5], [0.5, 1.0], [1.0, 0.0]]
+    with pytest.raises(ValueError):
+        parse_curve_points("0 0, 1")
+    with pytest.raises(ValueError):
+        parse_curve_points("0 0")
+    with pytest.raises(ValueError):
+        make_field("spiral", 0, 1)
+
+
+def test_noise_frequency_defaults():
+    assert make_field(FIELD_NOISE, 0, 1)["frequency"] == 0.1
+    assert make_field(FIELD_NOISE, 0, 1, "2")["frequency"] == 2.0
+
+
+def field_tables(stand_in_maya):
+    #ノイズ・カーブ・ランプの変数を持つparameter_tableを、NumPyありとなしで返す
+    recording = Recording(
+        [RecordedCommand("move -r {noise} {curve} {ramp} ;", ["noise", "curve", "ramp"]), RecordedCommand("scale {size} ;", ["size"])],
+        [
+            ParameterSpec("noise", "float", "move -r 0 0 0 ;", field=make_field(FIELD_NOISE, -2, 2, "0.7")),
+            ParameterSpec("curve", "float", "move -r 0 0 0 ;", field=make_field(FIELD_CURVE, 0, 10, "0 0, 0.5 1, 1 0")),
+            ParameterSpec("ramp", "float", "move -r 0 0 0 ;", field=make_field(FIELD_RAMP, 5, 1)),
+            ParameterSpec("size", "float3", "scale 1 1 1 ;", field=make_field(FIELD_NOISE, 1, 2)),
+        ],
+        "pCube1",
+    )
+    python_script = ScriptGenerator(recording).generate_python_script_noui()
+    cmds = stand_in_maya(0)
+    def xform(*args, **kwargs):
+        names = args[0] if isinstance(args[0], list) else [args[0]]
+        return [value for name in names for index in [int(name[len("pCube"):])] for value in (index * 1.3, -index * 0.4, index % 7 - 3.5)]
+    cmds.xform = xform
+    tables = []
+    for has_numpy in (True, False):
+        generated = {"__name__": "generated"}
+        exec(compile(python_script, "<generated>", "exec"), generated)
+        if not has_numpy:
+            generated["np"] = None
+        tables.append(generated)
+    return tables
+
+
+def test_field_values_stay_in_range(stand_in_maya):
+    selected_objects = [f"pCube{index}" for index in range(OBJECT_COUNT)]
+    for generated in field_tables(stand_in_maya):
+        rows = generated["parameter_table"](selected_objects)
+        assert all(-2.0 <= noise <= 2.0 and 0.0 <= curve <= 10.0 and 1.0 <= ramp <= 5.0 for noise, curve, ramp, size in rows)
+        assert all(len(size) == 3 and all(1.0 <= value <= 2.0 for value in size) for noise, curve, ramp, size in rows)
+        assert rows[0][1:3] == (0.0, 5.0) and rows[-1][1:3] == (0.0, 1.0) #カーブとランプは選択の最初と最後で両端の値
+        assert len(set(row[0] for row in rows)) > 1 and len(set(rows[0][3])) == 3 #位置と要素ごとに違う値
+        generated["position_cache"].clear()
+        assert generated["parameter_table"](selected_objects) == rows #同じ位置なら毎回同じ値
+
+
+def test_numpy_and_python_fields_agree(stand_in_maya):
+    pytest.importorskip("numpy")
+    selected_objects = [f"pCube{index}" for index in range(OBJECT_COUNT)]
+    numpy_generated, python_generated = field_tables(stand_in_maya)
+    numpy_rows = numpy_generated["parameter_table"](selected_objects)
+    python_rows = python_generated["parameter_table"](selected_objects)
+    for numpy_row, python_row in zip(numpy_rows, python_rows):
+        assert numpy_row[:3] == pytest.approx(python_row[:3])
+        assert numpy_row[3] == pytest.approx(python_row[3])
@@ -0,0 +1,35 @@
+from history_capture import CaptureSession
+
+
+def write_history(path, lines):
+    with open(path, "a", encoding="utf-8") as history_file:
+        history_file.write("".join(line + "\n" for line in lines))
+
+
+def test_multi_line_string_record_keeps_newline(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["print \"first line", "second line\";", "move -r 0 1 0;"])
+    assert session.poll() == (0, ["print \"first line\nsecond line\";", "move -r 0 1 0;"])
+
+
+def test_excluded_commands_and_results_are_skipped(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["select -r pCube1 ;", "// Result: pCube1 //", "polyCube;", "// Result: pCube2 polyCube1 //"])
+    assert session.poll()[1] == ["polyCube;", "// Result: pCube2 polyCube1 //"]
+
+
+def test_undo_removes_command_with_result(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["polyCube;", "// Result: pCube2 polyCube1 //", "undo;", "// Undo: polyCube //"])
+    session.poll()
+    assert session.records == []
+
+
+def test_echo_mode_drops_queries_and_their_results(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path), echo_all_commands=True)
+    write_history(history_path, ["getAttr pCube1.tx;", "// Result: 0 //", "polyCube;", "// Result: pCube2 polyCube1 //", "setParent ..;"])
+    assert session.poll()[1] == ["polyCube;", "// Result: pCube2 polyCube1 //"]
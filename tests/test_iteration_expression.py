@@ -0,0 +1,36 @@
+import pytest
+
+from iteration_expression import IterationExpression, IterationExpressionError
+
+
+def test_allowed_expression_sources():
+    expression = IterationExpression("i * sin(i / n * tau) + abs(x)")
+    assert expression.python_source == f"i * math.sin(i / n * {6.283185307179586}) + abs(x)"
+    assert expression.numpy_source == f"i * np.sin(i / n * {6.283185307179586}) + np.abs(x)"
+    assert expression.uses_position
+    assert expression.uses_math
+
+
+def test_expression_without_position():
+    expression = IterationExpression("2 ** 3 + i")
+    assert not expression.uses_position
+    assert not expression.uses_math
+
+
+@pytest.mark.parametrize("text", [
+    "__import__('os')",
+    "i.__class__",
+    "x[0]",
+    "open('a')",
+    "lambda: 1",
+    "i if n else 0",
+    "'text'",
+    "sin(i, n)",
+    "sin(x=i)",
+    "2 ** 1000",
+    "2 ** i",
+    "i +",
+])
+def test_disallowed_expressions(text):
+    with pytest.raises(IterationExpressionError):
+        IterationExpression(text)
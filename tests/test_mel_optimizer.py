@@ -0,0 +1,28 @@
+from mel_optimizer import optimize_mel_records
+
+
+def test_consecutive_set_attr_keeps_last_value():
+    assert optimize_mel_records(["setAttr \"pCube1.tx\" 1;", "setAttr \"pCube1.tx\" 2;"]) == (["setAttr \"pCube1.tx\" 2;"], 1)
+
+
+def test_set_attr_state_changes_are_kept():
+    mel_records = ["setAttr \"pCube1.tx\" 1;", "setAttr -lock on \"pCube1.tx\";"]
+    assert optimize_mel_records(mel_records) == (mel_records, 0)
+
+
+def test_relative_moves_are_summed():
+    assert optimize_mel_records(["move -r 0 1 0 ;", "move -r 0.5 2 0 ;"]) == (["move -r 0.5 3 0;"], 1)
+
+
+def test_rotations_on_different_axes_are_kept():
+    mel_records = ["rotate -r 0 45 0 ;", "rotate -r 30 0 0 ;"]
+    assert optimize_mel_records(mel_records) == (mel_records, 0)
+
+
+def test_toggles_cancel_out():
+    assert optimize_mel_records(["ToggleFaceNormalDisplay;", "ToggleFaceNormalDisplay;", "polyCube;"]) == (["polyCube;"], 2)
+
+
+def test_lines_with_variables_are_not_optimized():
+    mel_records = ["move -r 0 {height} 0 ;", "move -r 0 1 0 ;"]
+    assert optimize_mel_records(mel_records) == (mel_records, 0)
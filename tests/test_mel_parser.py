@@ -0,0 +1,45 @@
+from mel_parser import COMMENT, FLAG, NUMBER, SEMICOLON, STRING, WORD, parse_mel_line, replace_mel_token, tokenize_mel
+
+
+def test_tokenize_kinds():
+    tokens, is_open = tokenize_mel("move -r 0 1.5 -2 \"pCube1\"; // note")
+    assert not is_open
+    assert [token.kind for token in tokens] == [WORD, FLAG, NUMBER, NUMBER, NUMBER, STRING, SEMICOLON, COMMENT]
+    assert [token.value for token in tokens[2:6]] == [0, 1.5, -2, "pCube1"]
+
+
+def test_bracketed_words_stay_one_token():
+    tokens, is_open = tokenize_mel("polyBevel3 pCube1.e[4:7] `ls -sl`;")
+    assert not is_open
+    assert [token.text for token in tokens] == ["polyBevel3", "pCube1.e[4:7]", "`ls -sl`", ";"]
+
+
+def test_unclosed_string_is_open():
+    assert parse_mel_line("print \"first line").is_open
+    assert not parse_mel_line("print \"first line\nsecond line\";").is_open
+
+
+def test_multi_line_string_keeps_newline():
+    statement = parse_mel_line("print \"first line\nsecond line\";").statements[0]
+    assert statement.arguments[0].value == "first line\nsecond line"
+
+
+def test_line_comment_ends_at_newline():
+    mel_line = parse_mel_line("// first\nmove -r 0 1 0;")
+    assert [statement.command for statement in mel_line.statements] == ["move"]
+
+
+def test_statements_and_flags():
+    mel_line = parse_mel_line("move -r 0 1 0 pCube1; rotate -os 0 45 0;")
+    assert [statement.command for statement in mel_line.statements] == ["move", "rotate"]
+    move = mel_line.statements[0]
+    assert [(flag, [arg.text for arg in flag_args]) for flag, flag_args in move.flags] == [("-r", ["0", "1", "0"])]
+    assert [token.text for token in move.positional_args] == ["pCube1"]
+
+
+def test_result_line_is_comment_only():
+    assert parse_mel_line("// Result: pCube1 polyCube1 //").is_comment_only
+
+
+def test_replace_mel_token_keeps_spacing():
+    assert replace_mel_token("move -r  0 1 0 ;", 3, "{height}") == "move -r  0 {height} 0 ;"
@@ -0,0 +1,67 @@
+from mel_transpiler import escape_literal_braces, mel_command_depends_on_selection, mel_eval_python, transpile_batched_mel_command, transpile_mel_command
+
+
+def test_signature_table_maps_flags_to_keywords():
+    assert transpile_mel_command("polyExtrudeFacet -constructionHistory 1 -keepFacesTogether 1 -t 0 0.5 1 pCube1.f[1];", "obj") == [
+        "cmds.polyExtrudeFacet(\"pCube1.f[1]\", constructionHistory=1, keepFacesTogether=1, t=(0, 0.5, 1))"
+    ]
+    assert transpile_mel_command("setAttr -lock on \"pCube1.tx\";", "obj") == ["cmds.setAttr(\"pCube1.tx\", lock=True)"]
+
+
+def test_target_replaces_selection():
+    assert transpile_mel_command("move -r -os 0 1.5 0 ;", "obj") == ["cmds.move(0, 1.5, 0, obj, r=True, os=True)"]
+    assert transpile_mel_command("xform -ws -t 3 2 1 ;", "obj") == ["cmds.xform(obj, ws=True, t=(3, 2, 1))"]
+
+
+def test_unknown_commands_and_flags_fall_back_to_mel():
+    assert transpile_mel_command("polyUnknownThing -x 1;", "obj") is None
+    assert transpile_mel_command("move -r -unknownFlag 0 1 0;", "obj") is None
+    assert transpile_mel_command("move -r -$flag 1 0 0;", "obj") is None
+
+
+def test_variables_become_python_expressions():
+    assert transpile_mel_command("move -r 0 {height} 0 {obj};", "obj") == ["cmds.move(0, height, 0, obj, r=True)"]
+    assert transpile_mel_command("xform -r -t {offset[0]} {offset[1]} {offset[2]};", "obj") == ["cmds.xform(obj, r=True, t=offset)"]
+
+
+def test_parent_gets_target_before_parent_argument():
+    assert transpile_mel_command("parent grp1;", "obj") == ["cmds.parent(obj, \"grp1\")"]
+    assert transpile_mel_command("parent -w;", "obj") == ["cmds.parent(obj, w=True)"]
+    assert transpile_mel_command("parent pCube2 grp1;", "obj") == ["cmds.parent(\"pCube2\", \"grp1\")"]
+    assert mel_command_depends_on_selection("parent grp1;")
+    assert not mel_command_depends_on_selection("parent pCube2 grp1;")
+
+
+def test_empty_group_does_not_take_target():
+    assert transpile_mel_command("group -em -n \"grp1\";", "obj") == ["cmds.group(em=True, n=\"grp1\")"]
+    assert not mel_command_depends_on_selection("group -em -n \"grp1\";")
+    assert transpile_mel_command("group -n \"grp1\";", "obj") == ["cmds.group(obj, n=\"grp1\")"]
+
+
+def test_batched_commands_take_the_chunk():
+    assert transpile_batched_mel_command("delete -ch;") == ["cmds.delete(chunk, ch=True)"]
+    assert transpile_batched_mel_command("move -r 0 1 0;") is None
+
+
+def test_set_attr_boolean_words_are_values():
+    assert transpile_mel_command("setAttr \"pCube1.v\" off;", "obj") == ["cmds.setAttr(\"pCube1.v\", False)"]
+    assert transpile_mel_command("setAttr -type \"string\" \"pCube1.notes\" off;", "obj") == ["cmds.setAttr(\"pCube1.notes\", \"off\", type=\"string\")"]
+
+
+def test_only_declared_placeholders_become_fields():
+    mel_command = escape_literal_braces("setAttr -type \"string\" \"pCube1.notes\" \"a {b} c {height}\";", ["height"])
+    assert transpile_mel_command(mel_command, "obj") == ["cmds.setAttr(\"pCube1.notes\", f\"a {{b}} c {height}\", type=\"string\")"]
+    mel_command = escape_literal_braces("setAttr -type \"string\" \"pCube1.notes\" \"a {b} c\";")
+    assert transpile_mel_command(mel_command, "obj") == ["cmds.setAttr(\"pCube1.notes\", \"a {b} c\", type=\"string\")"]
+
+
+def test_mel_eval_literal_escapes_quotes_backslashes_and_braces():
+    for mel_command in ("print \"say \\\"hi\\\"\";", "string $a[] = {\"x\"};", "print \"a\nb\";"):
+        assert eval(mel_eval_python(escape_literal_braces(mel_command)), {"mel": StandInMelEval}) == mel_command
+    assert eval(mel_eval_python(escape_literal_braces("print \"{b}\" {obj};")), {"mel": StandInMelEval, "obj": "pCube1"}) == "print \"{b}\" pCube1;"
+
+
+class StandInMelEval:
+    @staticmethod
+    def eval(mel_command):
+        return mel_command
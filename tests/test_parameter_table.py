@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+from recording_ir import ParameterSpec, RecordedCommand, Recording
+from script_generator import UNDO_MODE_FLUSH, ScriptGenerator
+
+
+def iteration_recording(expression_text):
+    return Recording([RecordedCommand("move -r 0 {offset} 0 ;", ["offset"])], [ParameterSpec("offset", "float", "move -r 0 1 0 ;", iteration=expression_text)], "pCube1")
+
+
+def replay(stand_in_maya, recording, object_count, options=None):
+    python_script = ScriptGenerator(recording, options=options).generate_python_script_noui()
+    cmds = stand_in_maya(object_count)
+    exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+    return python_script, cmds
+
+
+def moves(cmds):
+    return [args for name, args, kwargs in cmds.calls if name == "move"]
+
+
+def test_each_object_gets_its_row_once_in_order(stand_in_maya):
+    python_script, cmds = replay(stand_in_maya, iteration_recording("i * 2 + n"), 4)
+    assert ".index(" not in python_script #オブジェクトごとに選択の中を探さない
+    assert moves(cmds) == [(0, float(2 * index + 4), 0, f"pCube{index}") for index in range(4)]
+
+
+def test_flushed_undo_keeps_the_rows(stand_in_maya):
+    python_script, cmds = replay(stand_in_maya, iteration_recording("i"), 5, {"undo_mode": UNDO_MODE_FLUSH, "flush_undo_every": 2})
+    assert moves(cmds) == [(0, float(index), 0, f"pCube{index}") for index in range(5)]
+    assert [name for name, args, kwargs in cmds.calls].count("flushUndo") == 2
+
+
+def parameter_table_functions(stand_in_maya, recording, options=None):
+    #NumPyありとNumPyなしのparameter_tableを返す
+    python_script = ScriptGenerator(recording, options=options).generate_python_script_noui()
+    stand_in_maya(0)
+    numpy_globals = {"__name__": "generated"}
+    exec(compile(python_script, "<generated>", "exec"), numpy_globals)
+    python_globals = {"__name__": "generated"}
+    exec(compile(python_script, "<generated>", "exec"), python_globals)
+    python_globals["np"] = None
+    return numpy_globals["parameter_table"], python_globals["parameter_table"]
+
+
+def test_numpy_and_python_backends_agree(stand_in_maya):
+    pytest.importorskip("numpy")
+    numpy_table, python_table = parameter_table_functions(stand_in_maya, iteration_recording("i ** 4 + sin(i) * n - i // 3"))
+    selected_objects = [f"pCube{index}" for index in range(100000)]
+    numpy_rows = numpy_table(selected_objects)
+    python_rows = python_table(selected_objects)
+    assert numpy_rows[-1][0] == pytest.approx(99999 ** 4 + math.sin(99999) * 100000 - 99999 // 3) #int64ではオーバーフローする大きさ
+    assert [row[0] for row in numpy_rows] == pytest.approx([row[0] for row in python_rows])
+
+
+def test_random_values_are_reproducible_with_a_seed(stand_in_maya):
+    recording = Recording(
+        [RecordedCommand("move -r {offset} {height} 0 ;", ["offset", "height"])],
+        [ParameterSpec("offset", "float", "move -r 1 1 0 ;", random_range=(0.0, 10.0)), ParameterSpec("height", "float", "move -r 1 1 0 ;", random_range=(0.0, 10.0))],
+        "pCube1",
+    )
+    selected_objects = [f"pCube{index}" for index in range(50)]
+    for parameter_table in parameter_table_functions(stand_in_maya, recording, {"random_seed": 7}):
+        rows = parameter_table(selected_objects)
+        assert rows == parameter_table(selected_objects) #同じシードなら毎回同じ値
+        assert all(0.0 <= value <= 10.0 for row in rows for value in row)
+        assert [row[0] for row in rows] != [row[1] for row in rows] #同じ範囲でも変数ごとに別の乱数列
@@ -0,0 +1,62 @@
+from callback_recorder import CallbackRecorder, LocalEventSource
+from history_capture import CaptureSession
+
+
+def write_history(path, lines):
+    with open(path, "a", encoding="utf-8") as history_file:
+        history_file.write("".join(line + "\n" for line in lines))
+
+
+def test_history_written_while_paused_is_skipped(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["polyCube;", "// Result: pCube2 polyCube1 //"])
+    assert session.poll(is_final=True) == (0, ["polyCube;", "// Result: pCube2 polyCube1 //"])
+    write_history(history_path, ["move -r 0 5 0;"]) #一時停止中の操作
+    session.resume()
+    write_history(history_path, ["move -r 0 1 0;"])
+    assert session.poll() == (0, ["move -r 0 1 0;"])
+    assert session.records == ["polyCube;", "// Result: pCube2 polyCube1 //", "move -r 0 1 0;"]
+
+
+def test_resume_drops_an_unfinished_record(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["print \"unfinished"])
+    session.poll(is_final=True)
+    session.resume()
+    write_history(history_path, ["polyCube;"])
+    assert session.poll() == (0, ["polyCube;"])
+
+
+def test_undo_after_resume_reaches_the_previous_segment(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["polyCube;"])
+    session.poll(is_final=True)
+    session.resume()
+    write_history(history_path, ["undo;", "// Undo: polyCube //"])
+    assert session.poll() == (1, [])
+    assert session.records == []
+
+
+def test_import_stops_capture_until_resumed(tmp_path):
+    history_path = tmp_path / "history.txt"
+    session = CaptureSession(str(history_path))
+    write_history(history_path, ["polyCube;", "import AutoScripting", "move -r 0 1 0;"])
+    assert session.poll() == (0, ["polyCube;"])
+    session.resume()
+    write_history(history_path, ["move -r 0 2 0;"])
+    assert session.poll() == (0, ["move -r 0 2 0;"])
+
+
+def test_callback_events_while_paused_are_not_recorded():
+    event_source = LocalEventSource()
+    recorder = CallbackRecorder(event_source)
+    recorder.start()
+    event_source.set_attribute("pCube1.tx", 1.0)
+    recorder.pause()
+    event_source.set_attribute("pCube1.ty", 2.0)
+    recorder.resume()
+    event_source.set_attribute("pCube1.tz", 3.0)
+    assert recorder.stop().mel_records == ["setAttr \"pCube1.tx\" 1.0;", "setAttr \"pCube1.tz\" 3.0;"]
@@ -0,0 +1,53 @@
+from history_capture import RecentCommandBuffer
+
+
+def write_history(path, lines):
+    with open(path, "a", encoding="utf-8") as history_file:
+        history_file.write("".join(line + "\n" for line in lines))
+
+
+def test_keeps_only_the_latest_commands(tmp_path):
+    history_path = tmp_path / "recent.txt"
+    buffer = RecentCommandBuffer(str(history_path), max_commands=3)
+    write_history(history_path, ["polyCube;", "// Result: pCube1 polyCube1 //"] + [f"move -r 0 {index} 0;" for index in range(4)])
+    buffer.poll()
+    assert buffer.recent_records(10) == ["move -r 0 1 0;", "move -r 0 2 0;", "move -r 0 3 0;"]
+    assert buffer.recent_records(1) == ["move -r 0 3 0;"]
+    assert buffer.recent_records(0) == []
+
+
+def test_results_stay_with_their_command(tmp_path):
+    history_path = tmp_path / "recent.txt"
+    buffer = RecentCommandBuffer(str(history_path), max_commands=2)
+    write_history(history_path, ["polyCube;", "// Result: pCube1 polyCube1 //", "polySphere;", "// Result: pSphere1 polySphere1 //"])
+    buffer.poll()
+    assert buffer.recent_records(1) == ["polySphere;", "// Result: pSphere1 polySphere1 //"]
+
+
+def test_shrinking_capacity_drops_oldest(tmp_path):
+    history_path = tmp_path / "recent.txt"
+    buffer = RecentCommandBuffer(str(history_path), max_commands=5)
+    write_history(history_path, [f"move -r 0 {index} 0;" for index in range(5)])
+    buffer.poll()
+    buffer.set_max_commands(2)
+    assert buffer.recent_records(5) == ["move -r 0 3 0;", "move -r 0 4 0;"]
+
+
+def test_undo_redo_and_import_do_not_stop_the_buffer(tmp_path):
+    history_path = tmp_path / "recent.txt"
+    buffer = RecentCommandBuffer(str(history_path), max_commands=5)
+    write_history(history_path, ["polyCube;", "move -r 0 1 0;", "undo;", "// Undo: move -r 0 1 0 //", "import AutoScripting", "move -r 0 2 0;"])
+    buffer.poll()
+    assert buffer.recent_records(5) == ["polyCube;", "move -r 0 2 0;"]
+
+
+def test_rotated_history_file_is_read_from_the_start(tmp_path):
+    first_path = tmp_path / "recent_0.txt"
+    second_path = tmp_path / "recent_1.txt"
+    buffer = RecentCommandBuffer(str(first_path), max_commands=5)
+    write_history(first_path, ["polyCube;"])
+    buffer.poll()
+    write_history(second_path, ["move -r 0 1 0;"])
+    buffer.switch_file(str(second_path))
+    buffer.poll()
+    assert buffer.recent_records(5) == ["polyCube;", "move -r 0 1 0;"]
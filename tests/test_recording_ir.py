@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from field_driver import make_field
+from recording_ir import RECORDING_FORMAT_VERSION, ParameterSpec, RecordedCommand, Recording
+from script_generator import ScriptGenerator
+
+
+def sample_recording():
+    return Recording(
+        [
+            RecordedCommand("polyExtrudeFacet -ch 1 -t {offset[0]} {offset[1]} {offset[2]} pCube1.f[1];", ["offset"]),
+            RecordedCommand("move -r 0 {height} 0 ;", ["height"]),
+            RecordedCommand("setAttr -type \"string\" \"pCube1.notes\" \"{label}\";", ["label"]),
+            RecordedCommand("// Result: polyExtrudeFace1 //"),
+        ],
+        [
+            ParameterSpec("offset", "float3", "polyExtrudeFacet -ch 1 -t 0 0.5 1 pCube1.f[1];", random_range=(-1.0, 1.0)),
+            ParameterSpec("height", "float", "move -r 0 1 0 ;", iteration="i * 0.5"),
+            ParameterSpec("label", "string", "setAttr -type \"string\" \"pCube1.notes\" \"a\";"),
+            ParameterSpec("scale", "float", "", field=make_field("curve", 0, 2, "0 0, 1 1")),
+        ],
+        "pCube1",
+    )
+
+
+def test_save_and_load_round_trip(tmp_path):
+    recording_path = tmp_path / "sample.recording.json"
+    recording = sample_recording()
+    recording.save(str(recording_path))
+    loaded = Recording.load(str(recording_path))
+    assert loaded.to_dict() == recording.to_dict()
+    assert loaded.parameters[0].random_range == (-1.0, 1.0)
+    assert loaded.commands[0].variables == ["offset"]
+    #読み込んだ記録からも同じスクリプトが生成される
+    assert ScriptGenerator(loaded).generate_python_script_noui() == ScriptGenerator(recording).generate_python_script_noui()
+
+
+def test_minimal_dict_uses_defaults():
+    recording = Recording.from_dict({"commands": [{"mel": "polyCube;"}], "parameters": [{"name": "size", "type": "int"}]})
+    assert recording.mel_records == ["polyCube;"]
+    assert recording.operating_mesh is None
+    assert recording.parameters[0].is_ui_variable
+    assert recording.to_dict()["version"] == RECORDING_FORMAT_VERSION
+
+
+def test_newer_version_is_rejected(tmp_path):
+    recording_path = tmp_path / "future.recording.json"
+    recording_path.write_text(json.dumps({"version": RECORDING_FORMAT_VERSION + 1, "commands": []}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        Recording.load(str(recording_path))
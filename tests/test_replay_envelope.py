@@ -0,0 +1,60 @@
+import pytest
+
+from recording_ir import Recording
+from script_generator import UNDO_MODE_CHUNK, UNDO_MODE_DISABLE, UNDO_MODE_FLUSH, ScriptGenerator
+
+MEL_RECORDS = ["move -r 0 1 0;"]
+
+
+def replay(stand_in_maya, options, object_count=5):
+    python_script = ScriptGenerator(Recording.from_mel_records(MEL_RECORDS, "pCube0"), options=options).generate_python_script_noui()
+    cmds = stand_in_maya(object_count)
+    exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+    return cmds
+
+
+def envelope_calls(cmds):
+    return [(name, kwargs) for name, args, kwargs in cmds.calls if name in ("undoInfo", "refresh", "flushUndo")]
+
+
+def test_chunk_envelope(stand_in_maya):
+    cmds = replay(stand_in_maya, {"undo_mode": UNDO_MODE_CHUNK})
+    assert envelope_calls(cmds) == [
+        ("undoInfo", {"q": True, "state": True}),
+        ("undoInfo", {"openChunk": True}),
+        ("refresh", {"suspend": True}),
+        ("refresh", {"suspend": False}),
+        ("undoInfo", {"closeChunk": True}),
+        ("undoInfo", {"stateWithoutFlush": ["undoInfo1"]}),
+    ]
+    assert [name for name, args, kwargs in cmds.calls].count("move") == 5
+
+
+def test_disabled_undo_without_refresh_suspension(stand_in_maya):
+    cmds = replay(stand_in_maya, {"undo_mode": UNDO_MODE_DISABLE, "suspend_refresh": False})
+    assert envelope_calls(cmds) == [
+        ("undoInfo", {"q": True, "state": True}),
+        ("undoInfo", {"stateWithoutFlush": False}),
+        ("undoInfo", {"stateWithoutFlush": ["undoInfo1"]}),
+    ]
+
+
+def test_flush_every_n_objects(stand_in_maya):
+    cmds = replay(stand_in_maya, {"undo_mode": UNDO_MODE_FLUSH, "flush_undo_every": 2}, object_count=5)
+    command_names = [name for name, args, kwargs in cmds.calls if name in ("move", "flushUndo")]
+    assert command_names == ["move", "move", "flushUndo", "move", "move", "flushUndo", "move"]
+
+
+def test_envelope_is_restored_after_an_error(stand_in_maya):
+    python_script = ScriptGenerator(Recording.from_mel_records(MEL_RECORDS, "pCube0")).generate_python_script_noui()
+    cmds = stand_in_maya(3)
+    def failing_move(*args, **kwargs):
+        raise RuntimeError("move failed")
+    cmds.move = failing_move
+    with pytest.raises(RuntimeError):
+        exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+    assert envelope_calls(cmds)[-3:] == [
+        ("refresh", {"suspend": False}),
+        ("undoInfo", {"closeChunk": True}),
+        ("undoInfo", {"stateWithoutFlush": ["undoInfo1"]}),
+    ]
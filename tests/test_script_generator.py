@@ -0,0 +1,62 @@
+from recording_ir import Recording
+from script_generator import ScriptGenerator
+
+
+def generated_function(mel_records, operating_mesh="pCube1"):
+    return ScriptGenerator(Recording.from_mel_records(mel_records, operating_mesh)).generate_python_fucntion()
+
+
+def test_created_nodes_become_variables():
+    command_entries = generated_function(["polyCube -w 1;", "// Result: pCube2 polyCube1 //", "move -r 0 1 0 pCube2;"])
+    assert command_entries[0]["node_variable"] == "new_node_0"
+    assert command_entries[1]["python"] == ["cmds.move(0, 1, 0, new_node_0[0], r=True)"]
+
+
+def test_numeric_results_are_not_node_names():
+    command_entries = generated_function(["move -r 10 0 0;", "// Result: 10 //", "move -r 10 0 0;"])
+    assert [entry["python"] for entry in command_entries] == [["cmds.move(10, 0, 0, obj, r=True)"]] * 2
+    assert command_entries[0]["node_variable"] is None
+
+
+def test_query_results_keep_the_target():
+    command_entries = generated_function(["xform -q -ws -t;", "// Result: 0 1 2 //", "move -r 0 1 0;"])
+    assert command_entries[0]["node_variable"] is None
+    assert command_entries[1]["python"] == ["cmds.move(0, 1, 0, obj, r=True)"]
+
+
+def test_operating_mesh_name_is_replaced():
+    command_entries = generated_function(["polySoftEdge -a 30 -ch 1 pCube1;", "setAttr \"pCube10.tx\" 1;"])
+    assert command_entries[0]["python"] == ["cmds.polySoftEdge(obj, a=30, ch=1)"]
+    assert command_entries[1]["python"] == ["cmds.setAttr(\"pCube10.tx\", 1)"]
+
+
+def test_generated_script_compiles():
+    python_script = ScriptGenerator(Recording.from_mel_records(["polyCube;", "// Result: pCube2 polyCube1 //", "print \"a\nb\";"], "pCube1")).generate_python_script_noui()
+    compile(python_script, "<generated>", "exec")
+
+
+def test_untranslatable_lines_compile_and_run(stand_in_maya):
+    mel_records = ["print \"say \\\"hi\\\"\";", "string $a[] = {\"x\"};", "setAttr -type \"string\" \"pCube1.notes\" \"a {b} c\";"]
+    python_script = ScriptGenerator(Recording.from_mel_records(mel_records, "pCube1")).generate_python_script_noui()
+    stand_in_maya(3)
+    exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+
+
+def test_targets_are_resolved_when_they_are_used(stand_in_maya):
+    python_script = ScriptGenerator(Recording.from_mel_records(["move -r 0 1 0;"], "pCube1")).generate_python_script_noui()
+    cmds = stand_in_maya(3)
+    paths = {"pCube0": "|pCube0", "pCube1": "|pCube1", "pCube2": "|pCube2"} #UUID -> 現在のパス
+    moved_objects = []
+    def ls(*args, **kwargs):
+        if args:
+            return [paths[args[0]]] if args[0] in paths else []
+        return list(cmds.selected_objects)
+    def move(*args, **kwargs):
+        moved_objects.append(args[-1])
+        if args[-1] == "|pCube0":
+            paths["pCube1"] = "|group1|pCube1" #前のオブジェクトの操作で親が変わる
+            del paths["pCube2"] #前のオブジェクトの操作で削除される
+    cmds.ls = ls
+    cmds.move = move
+    exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+    assert moved_objects == ["|pCube0", "|group1|pCube1"]
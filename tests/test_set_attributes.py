@@ -0,0 +1,116 @@
+import sys
+import types
+
+from recording_ir import Recording
+from script_generator import ScriptGenerator
+
+MEL_RECORDS = ["setAttr \"pCube1.tx\" 1;", "setAttr \"pCube1.visibility\" 0;", "move -r 0 1 0;", "setAttr \"pCube1.t\" -type double3 1 2 3;"]
+
+
+class StandInAttribute:
+    def __init__(self, kind):
+        self.kind = kind
+
+    def hasFn(self, kind):
+        return kind == self.kind
+
+
+class StandInPlug:
+    def __init__(self, name, children=()):
+        self.plug_name = name
+        self.children = [StandInPlug(child) for child in children]
+        self.isCompound = bool(children)
+
+    def numChildren(self):
+        return len(self.children)
+
+    def child(self, index):
+        return self.children[index]
+
+    def attribute(self):
+        return StandInAttribute("numeric")
+
+    def name(self):
+        return self.plug_name
+
+
+class StandInOpenMaya(types.ModuleType):
+    #MDGModifierで書き込んだ値を記録するだけのOpenMaya
+    def __init__(self, missing_plugs=()):
+        super().__init__("maya.api.OpenMaya")
+        self.missing_plugs = set(missing_plugs)
+        self.written_values = []
+        self.do_it_count = 0
+        self.MFn = types.SimpleNamespace(kUnitAttribute="unit", kEnumAttribute="enum", kNumericAttribute="numeric")
+        self.MFnNumericData = types.SimpleNamespace(kBoolean="bool", kFloat="float", kDouble="double")
+        stand_in = self
+
+        class MSelectionList:
+            def add(self, plug_name):
+                if plug_name in stand_in.missing_plugs:
+                    raise RuntimeError(plug_name)
+                self.plug_name = plug_name
+                return self
+
+            def getPlug(self, index):
+                children = ("x", "y", "z") if self.plug_name.endswith(".t") else ()
+                return StandInPlug(self.plug_name, [f"{self.plug_name}{child}" for child in children])
+
+        class MFnNumericAttribute:
+            def __init__(self, attribute):
+                pass
+
+            def numericType(self):
+                return "double"
+
+        class MDGModifier:
+            def newPlugValueDouble(self, plug, value):
+                stand_in.written_values.append((plug.name(), value))
+
+            def doIt(self):
+                stand_in.do_it_count += 1
+
+        self.MSelectionList = MSelectionList
+        self.MFnNumericAttribute = MFnNumericAttribute
+        self.MDGModifier = MDGModifier
+
+
+def replay(stand_in_maya, monkeypatch, open_maya=None, object_count=2):
+    python_script = ScriptGenerator(Recording.from_mel_records(MEL_RECORDS, "pCube1"), options={"modifier_set_attr": True}).generate_python_script_noui()
+    cmds = stand_in_maya(object_count)
+    if open_maya is not None:
+        api = types.ModuleType("maya.api")
+        api.OpenMaya = open_maya
+        monkeypatch.setitem(sys.modules, "maya.api", api)
+        monkeypatch.setitem(sys.modules, "maya.api.OpenMaya", open_maya)
+        sys.modules["maya"].api = api
+    exec(compile(python_script, "<generated>", "exec"), {"__name__": "generated"})
+    return python_script, cmds
+
+
+def test_consecutive_set_attrs_are_grouped(stand_in_maya, monkeypatch):
+    python_script, cmds = replay(stand_in_maya, monkeypatch)
+    assert python_script.count("set_attributes([") == 2 #moveで区切られた二つのまとまり
+    assert "cmds.setAttr(" not in python_script.split("def operation")[1].split("\n\n")[0]
+
+
+def test_cmds_fallback_without_open_maya(stand_in_maya, monkeypatch):
+    python_script, cmds = replay(stand_in_maya, monkeypatch)
+    assert [(name, args) for name, args, kwargs in cmds.calls if name in ("setAttr", "move")] == [
+        ("setAttr", ("pCube0.tx", 1)),
+        ("setAttr", ("pCube0.visibility", 0)),
+        ("move", (0, 1, 0, "pCube0")),
+        ("setAttr", ("pCube0.t", 1, 2, 3)),
+        ("setAttr", ("pCube1.tx", 1)),
+        ("setAttr", ("pCube1.visibility", 0)),
+        ("move", (0, 1, 0, "pCube1")),
+        ("setAttr", ("pCube1.t", 1, 2, 3)),
+    ]
+
+
+def test_modifier_writes_and_falls_back_per_plug(stand_in_maya, monkeypatch):
+    open_maya = StandInOpenMaya(missing_plugs={"pCube0.visibility"})
+    python_script, cmds = replay(stand_in_maya, monkeypatch, open_maya, object_count=1)
+    assert open_maya.written_values == [("pCube0.tx", 1.0), ("pCube0.tx", 1.0), ("pCube0.ty", 2.0), ("pCube0.tz", 3.0)]
+    assert open_maya.do_it_count == 2
+    assert [(name, args) for name, args, kwargs in cmds.calls if name == "setAttr"] == [("setAttr", ("pCube0.visibility", 0))] #APIで書き込めないプラグだけcmdsで書き込む
@@ -0,0 +1,52 @@
+from recording_ir import ParameterSpec, RecordedCommand, Recording
+from script_generator import ORDER_AXIS_X, ORDER_GRID, ORDER_PATH, ScriptGenerator
+
+RECORDING = Recording([RecordedCommand("move -r 0 {offset} 0 ;", ["offset"])], [ParameterSpec("offset", "float", "move -r 0 1 0 ;", iteration="i")], "pCube1")
+
+
+def replay(stand_in_maya, positions, iteration_order):
+    #positionsはオブジェクトごとのワールド位置、戻り値はiの順に並べたオブジェクト名
+    python_script = ScriptGenerator(RECORDING, options={"iteration_order": iteration_order}).generate_python_script_noui()
+    cmds = stand_in_maya(len(positions))
+    def xform(*args, **kwargs):
+        names = args[0] if isinstance(args[0], list) else [args[0]]
+        return [value for name in names for value in positions[int(name[len("pCube"):])]]
+    cmds.xform = xform
+    generated = {"__name__": "generated"}
+    exec(compile(python_script, "<generated>", "exec"), generated)
+    moves = sorted((args[1], args[3]) for name, args, kwargs in cmds.calls if name == "move")
+    return [obj for i, obj in moves], generated
+
+
+def test_axis_order(stand_in_maya):
+    ordered, generated = replay(stand_in_maya, [(3.0, 0.0, 0.0), (-1.0, 5.0, 0.0), (2.0, 0.0, 1.0)], ORDER_AXIS_X)
+    assert ordered == ["pCube1", "pCube2", "pCube0"]
+
+
+def test_grid_order(stand_in_maya):
+    ordered, generated = replay(stand_in_maya, [(1.5, 0.0, 1.2), (0.5, 0.0, 1.8), (1.5, 0.0, 0.1), (0.2, 0.0, 0.9)], ORDER_GRID)
+    assert ordered == ["pCube3", "pCube2", "pCube1", "pCube0"] #Z方向の行ごとにX方向へ並べる
+
+
+def test_nearest_neighbour_path_starts_at_the_first_selected(stand_in_maya):
+    ordered, generated = replay(stand_in_maya, [(0.0, 0.0, 0.0), (5.0, 0.0, 0.0), (1.0, 0.0, 0.0), (2.5, 0.0, 0.0), (-4.0, 0.0, 0.0)], ORDER_PATH)
+    assert ordered == ["pCube0", "pCube2", "pCube3", "pCube1", "pCube4"]
+
+
+def test_order_is_reused_until_a_transform_changes(stand_in_maya):
+    positions = [(2.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, 0.0)]
+    ordered, generated = replay(stand_in_maya, positions, ORDER_AXIS_X)
+    sort_count = []
+    spatial_order = generated["spatial_order"]
+    def counted_spatial_order(object_positions):
+        sort_count.append(len(object_positions))
+        return spatial_order(object_positions)
+    generated["spatial_order"] = counted_spatial_order
+    selected_objects = ["pCube0", "pCube1", "pCube2"]
+    generated["position_cache"].clear() #次の実行
+    assert generated["ordered_objects"](selected_objects) == ["pCube2", "pCube1", "pCube0"]
+    assert sort_count == [] #同じ選択で位置も変わっていなければ並べ替えない
+    positions[0] = (-1.0, 0.0, 0.0)
+    generated["position_cache"].clear()
+    assert generated["ordered_objects"](selected_objects) == ["pCube0", "pCube2", "pCube1"]
+    assert sort_count == [3]